@@ -0,0 +1,30 @@
+# Ringo Radar - Leaderboard - code by ringokakiage #
+import streamlit as st
+from ringo.data import METRIC_COLUMNS
+from ringo.engine import SCOPE_ALL, SCOPE_LEAGUE
+from ringo.matrix import MATRIX_THRESHOLDS
+from ringo.plot import RadarError
+from ringo.positions import POSITION_KEYS
+from ringo.ui import get_engine
+
+engine = get_engine()
+wyscout = engine.df
+
+st.title("Ringo Radar - Leaderboard")
+st.write("Os melhores jogadores de cada posição em uma métrica, pelo percentil.")
+
+with st.sidebar:
+    position_key = st.selectbox("Posição", POSITION_KEYS, index=POSITION_KEYS.index("CB"))
+    metric = st.selectbox("Métrica", METRIC_COLUMNS)
+    comparison_scope = st.selectbox("Percentil calculado contra:", [SCOPE_ALL, SCOPE_LEAGUE])
+    league = st.selectbox("Liga", ["Todas as ligas"] + list(wyscout["League"].sort_values().unique()), index=0)
+    # Thresholds of the percentile matrix only, any other one would be computed on every change
+    min_minutes = st.select_slider("Selecione o mínimo de minutos jogados", options=MATRIX_THRESHOLDS, value=500)
+    top = st.number_input("Número de jogadores", min_value=5, max_value=200, value=20, step=5)
+
+try:
+    leaderboard = engine.leaderboard(position_key, metric, comparison_scope, min_minutes,
+                                     league=None if league == "Todas as ligas" else league, top=top)
+    st.dataframe(leaderboard, hide_index=True)
+except RadarError as e:
+    st.error(str(e))
@@ -0,0 +1,48 @@
+# Ringo Radar - Screening - code by ringokakiage #
+import streamlit as st
+from ringo.data import METRIC_COLUMNS
+from ringo.engine import SCOPE_ALL, SCOPE_LEAGUE
+from ringo.matrix import MATRIX_THRESHOLDS
+from ringo.positions import POSITION_KEYS
+from ringo.screening import SCORE_COLUMN, page, page_count, screen
+from ringo.ui import get_engine
+
+engine = get_engine()
+wyscout = engine.df
+
+# The age slider ends mean no limit
+AGE_RANGE = (15, 45)
+
+st.title("Ringo Radar - Triagem")
+st.write("Todos os jogadores que atendem aos critérios, com o percentil em cada métrica.")
+
+with st.sidebar:
+    positions = st.multiselect("Posições", POSITION_KEYS, default=["CB"])
+    comparison_scope = st.selectbox("Percentil calculado contra:", [SCOPE_ALL, SCOPE_LEAGUE])
+    # Thresholds of the percentile matrix only, any other one would be computed on every change
+    min_minutes = st.select_slider("Selecione o mínimo de minutos jogados", options=MATRIX_THRESHOLDS, value=500)
+    min_age, max_age = st.slider("Idade", min_value=AGE_RANGE[0], max_value=AGE_RANGE[1], value=AGE_RANGE)
+    leagues = st.multiselect("Ligas (vazio = todas)", list(wyscout["League"].sort_values().unique()))
+    st.write("Percentil mínimo (0 = sem filtro)")
+    min_percentiles = {}
+    for metric in METRIC_COLUMNS:
+        value = st.slider(metric, min_value=0, max_value=100, value=0, step=5, key=f"screening_{metric}")
+        if value > 0:
+            min_percentiles[metric] = value
+
+col_sort, col_order, col_size = st.columns(3)
+sort_by = col_sort.selectbox("Ordenar por", [SCORE_COLUMN] + METRIC_COLUMNS + ["Age", "Minutes played", "Player"])
+ascending = col_order.toggle("Ordem crescente", value=False)
+page_size = col_size.selectbox("Jogadores por página", [25, 50, 100, 200], index=1)
+
+result = screen(engine, positions, min_percentiles, comparison_scope, min_minutes,
+                min_age=None if min_age == AGE_RANGE[0] else min_age,
+                max_age=None if max_age == AGE_RANGE[1] else max_age,
+                leagues=leagues or None, sort_by=sort_by, ascending=ascending)
+
+st.write(f"{len(result)} jogadores encontrados")
+pages = page_count(result, page_size)
+page_number = st.number_input(f"Página (de {pages})", min_value=1, max_value=pages, value=1)
+st.dataframe(page(result, page_number, page_size), hide_index=True)
+st.download_button("Baixar CSV", data=result.to_csv(index=False).encode("utf-8"), file_name="triagem.csv",
+                   mime="text/csv")
@@ -0,0 +1 @@
+# Ringo Radar - core library used by the Streamlit app - code by ringokakiage #
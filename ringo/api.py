@@ -0,0 +1,381 @@
+# Ringo Radar - HTTP JSON API - code by ringokakiage #
+#
+#   python -m ringo.api --port 8600 --workers 16
+#
+#   GET /                                                   dataset version and what is available
+#   GET /players?q=zenon&limit=20                           player lookup by name
+#   GET /percentiles?id=-212141&position=LW&scope=league    percentiles of a player
+#   GET /radar.png?league=...&team=...&player=...&position=LW&min_minutes=600
+#   GET /memory                                             memory usage of the server, never cached
+#
+# A player is given by Wyscout id (plus team and league when they played for several teams)
+# or by league, team and player name, always with a position: a Wyscout position (LW) or a
+# position pool (WIN). Every response has an ETag made from the dataset hash and the query,
+# a request with a matching If-None-Match gets a 304 without any work. JSON bodies are kept
+# in a response cache and PNGs in the engine's render cache, both keyed on the data version.
+# Requests are served by a fixed pool of worker threads sharing one RadarEngine.
+import argparse
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+from ringo.cache import RenderCache  # noqa: E402
+from ringo.data import DATABASE_PATH, ID_COLUMN, PLOT_TYPES  # noqa: E402
+from ringo.engine import SCOPE_ALL, SCOPE_LEAGUE, RadarEngine, normalize_scope  # noqa: E402
+from ringo.export import VALUE_DISPLAYS, raw_position_for  # noqa: E402
+from ringo.plot import DEFAULT_MIN_MINUTES, RadarError  # noqa: E402
+from ringo.positions import POSITION_KEYS, position_map  # noqa: E402
+from ringo.search import NameIndex  # noqa: E402
+from ringo.timing import stage, start_timer  # noqa: E402
+
+DEFAULT_PORT = 8600
+DEFAULT_WORKERS = 16
+
+# New ingestions (python -m ringo.ingest) are picked up at most this often
+REFRESH_SECONDS = 10
+
+# JSON bodies kept in memory, PNGs are in the engine's render cache
+RESPONSE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+# Resolutions a radar can be asked in, one pre-drawn template is kept for each
+DPI_CHOICES = (100, 150, 200, 300)
+
+# Keep-alive connections idle this long give their worker back
+IDLE_TIMEOUT_SECONDS = 5
+
+PLAYERS_LIMIT = 100
+SCOPE_NAMES = {SCOPE_ALL: "all", SCOPE_LEAGUE: "league"}
+JSON_TYPE = "application/json; charset=utf-8"
+PNG_TYPE = "image/png"
+
+logger = logging.getLogger("ringo.api")
+
+
+class ApiError(Exception):
+    # Bad request (400) or nothing found (404), the message goes back to the client
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _number(value):
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def _int_param(params, name, default, choices=None):
+    if name not in params:
+        return default
+    try:
+        value = int(params[name])
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer, got {params[name]!r}")
+    if choices is not None and value not in choices:
+        raise ApiError(400, f"{name} can only be one of {list(choices)}, got {value}")
+    return value
+
+
+def _json(body):
+    return JSON_TYPE, json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+
+def _etag_matches(etag, if_none_match):
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+class RadarApi:
+    # Endpoints as plain methods: handle() takes a path and its query parameters and gives
+    # (status, etag, content type, body), the HTTP server only moves bytes around
+    def __init__(self, engine=None, refresh_seconds=REFRESH_SECONDS):
+        self.engine = RadarEngine() if engine is None else engine
+        self.responses = RenderCache(RESPONSE_CACHE_MAX_BYTES, budget=self.engine.memory_budget, name="responses")
+        self.refresh_seconds = refresh_seconds
+        self.routes = {
+            "/": (self.index, JSON_TYPE),
+            "/players": (self.players, JSON_TYPE),
+            "/percentiles": (self.percentiles, JSON_TYPE),
+            "/radar.png": (self.radar_png, PNG_TYPE),
+            "/memory": (self.memory, JSON_TYPE),
+        }
+        # Answers that change without the data changing, no ETag and no response cache
+        self.uncached_routes = {"/memory"}
+        self._search = None
+        self._refreshed_at = time.monotonic()
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self):
+        # One request checks for new ingestions while the others go on with the current data
+        if time.monotonic() - self._refreshed_at < self.refresh_seconds:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self._refreshed_at = time.monotonic()
+            self.engine.refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def search_index(self):
+        # The hash is read before the data: refresh() replaces the data first
+        dataset_hash = self.engine.dataset_hash
+        search = self._search
+        if search is None or search[0] != dataset_hash:
+            search = self._search = (dataset_hash, NameIndex(self.engine.df))
+        return search[1]
+
+    def etag(self, path, params):
+        key = json.dumps([self.engine.dataset_hash, path, sorted(params.items())], ensure_ascii=False)
+        return '"' + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+    def handle(self, path, params, if_none_match=None):
+        route = self.routes.get(path)
+        if route is None:
+            return self._error(404, f"Unknown endpoint {path}, see /")
+        endpoint, content_type = route
+        self.refresh()
+        if path in self.uncached_routes:
+            return self._call(endpoint, params, None)
+        etag = self.etag(path, params)
+        if if_none_match and _etag_matches(etag, if_none_match):
+            return 304, etag, None, b""
+        if content_type == JSON_TYPE:
+            body = self.responses.get(etag)
+            if body is not None:
+                return 200, etag, content_type, body
+        status, etag, content_type, body = self._call(endpoint, params, etag)
+        if status == 200 and content_type == JSON_TYPE:
+            self.responses.put(etag, body)
+        return status, etag, content_type, body
+
+    def _call(self, endpoint, params, etag):
+        # (status, etag, content type, body) of the endpoint, errors as JSON
+        try:
+            content_type, body = endpoint(params)
+        except ApiError as e:
+            return self._error(e.status, str(e))
+        except RadarError as e:
+            return self._error(404, str(e))
+        except ValueError as e:
+            return self._error(400, str(e))
+        except Exception:
+            # A bug answers 500, the connection and the worker carry on
+            logger.exception("Error serving %s", params)
+            return self._error(500, "Internal server error")
+        return 200, etag, content_type, body
+
+    @staticmethod
+    def _error(status, message):
+        return (status, None) + _json({"error": message})
+
+    def index(self, params):
+        return _json({
+            "dataset_hash": self.engine.dataset_hash,
+            "rows": int(self.engine.df.shape[0]),
+            "plot_types": PLOT_TYPES,
+            "positions": POSITION_KEYS,
+            "scopes": list(SCOPE_NAMES.values()),
+            "value_displays": list(VALUE_DISPLAYS),
+            "dpi": list(DPI_CHOICES),
+            "endpoints": list(self.routes),
+        })
+
+    def memory(self, params):
+        return _json(self.engine.memory_usage())
+
+    def players(self, params):
+        query = params.get("q", "").strip()
+        if not query:
+            raise ApiError(400, "q is required, part of the player name")
+        limit = _int_param(params, "limit", 20)
+        if limit < 1:
+            raise ApiError(400, f"limit must be at least 1, got {limit}")
+        limit = min(limit, PLAYERS_LIMIT)
+        with stage("search"):
+            rows = self.engine.df.loc[self.search_index().search(query, limit)]
+        players = []
+        for _, row in rows.iterrows():
+            positions = [pos.strip() for pos in str(row["Position"]).split(",") if pos.strip()]
+            players.append({
+                "id": int(row[ID_COLUMN]),
+                "player": row["Player"],
+                "team": row["Team within selected timeframe"],
+                "league": row["League"],
+                "age": _number(row["Age"]),
+                "minutes": int(row["Minutes played"]),
+                "positions": positions,
+                "position_keys": list(dict.fromkeys(position_map[pos] for pos in positions if pos in position_map)),
+            })
+        return _json({"query": query, "players": players})
+
+    def player_info(self, params):
+        # (league, team, player, position, wyscout_id) of the query parameters, the id is None
+        # when the player is given by name
+        position = params.get("position", "").strip()
+        if not position:
+            raise ApiError(400, "position is required, a Wyscout position (LW) or a position pool (WIN)")
+        if "id" in params:
+            wyscout_id = _int_param(params, "id", None)
+            df = self.engine.df
+            rows = df[df[ID_COLUMN] == wyscout_id]
+            if params.get("league"):
+                rows = rows[rows["League"] == params["league"]]
+            if params.get("team"):
+                rows = rows[rows["Team within selected timeframe"] == params["team"]]
+            rows = rows.drop_duplicates(subset=["Team within selected timeframe", "League"])
+            if rows.empty:
+                raise ApiError(404, f"No player with id {wyscout_id}")
+            if len(rows) > 1:
+                teams = "; ".join(f"{team} ({league})" for team, league in
+                                  zip(rows["Team within selected timeframe"], rows["League"]))
+                raise ApiError(400, f"Player {wyscout_id} played for several teams, give team and league: {teams}")
+            row = rows.iloc[0]
+            league, team, player = row["League"], row["Team within selected timeframe"], row["Player"]
+        else:
+            wyscout_id = None
+            missing = [name for name in ("league", "team", "player") if not params.get(name)]
+            if missing:
+                raise ApiError(400, f"Give id, or league, team and player (missing: {', '.join(missing)})")
+            league, team, player = params["league"], params["team"], params["player"]
+
+        if position not in position_map and position in POSITION_KEYS:
+            rows = self.engine.player_rows((league, team, player, position, wyscout_id))
+            raw_position = raw_position_for(rows["Position"].iloc[0], position) if not rows.empty else None
+            if raw_position is None:
+                raise ApiError(404, f"No data found for player: {player} in team: {team} under position: {position}")
+            position = raw_position
+        return league, team, player, position, wyscout_id
+
+    def _radar_settings(self, params):
+        scope = normalize_scope(params.get("scope", "all"))
+        min_minutes = _int_param(params, "min_minutes", DEFAULT_MIN_MINUTES)
+        plot_type = params.get("plot_type", "metrics")
+        return scope, min_minutes, plot_type
+
+    def percentiles(self, params):
+        player_info = self.player_info(params)
+        scope, min_minutes, plot_type = self._radar_settings(params)
+        with stage("percentiles"):
+            pizza_values = self.engine.pizza_values(player_info, scope, min_minutes, plot_type)
+        if pizza_values is None:
+            raise RadarError(f"Positions {player_info[3]} are not categorized.")
+        league, team, player, position = player_info[:4]
+        return _json({
+            "league": league,
+            "team": team,
+            "player": player,
+            "position": position,
+            "position_key": pizza_values["position_key"],
+            "scope": SCOPE_NAMES[scope],
+            "min_minutes": min_minutes,
+            "plot_type": plot_type,
+            "pool_size": int(pizza_values["num_players"]),
+            "metrics": [
+                {"metric": metric, "value": _number(value), "percentile": _number(percentile)}
+                for metric, value, percentile in zip(pizza_values["columns"], pizza_values["values"],
+                                                     pizza_values["percentiles"])
+            ],
+        })
+
+    def radar_png(self, params):
+        player_info = self.player_info(params)
+        scope, min_minutes, plot_type = self._radar_settings(params)
+        value_display = params.get("values", "percentile")
+        if value_display not in VALUE_DISPLAYS:
+            raise ApiError(400, f"values can only be one of {list(VALUE_DISPLAYS)}, got {value_display!r}")
+        dpi = _int_param(params, "dpi", 200, DPI_CHOICES)
+        return PNG_TYPE, self.engine.render_png(player_info, scope, min_minutes, VALUE_DISPLAYS[value_display],
+                                                plot_type, dpi)
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "RingoRadar"
+    timeout = IDLE_TIMEOUT_SECONDS
+    # Headers and body are separate writes, without this every keep-alive response waits ~40 ms
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        timer = start_timer(f"api {url.path}")
+        status, etag, content_type, body = self.server.api.handle(url.path, params, self.headers.get("If-None-Match"))
+        if timer is not None:
+            timer.finish()
+
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", etag)
+            # Clients keep the response and ask again with If-None-Match
+            self.send_header("Cache-Control", "no-cache")
+        if content_type is not None:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+
+class ApiServer(HTTPServer):
+    # Connections are handled by a fixed pool of threads instead of a new thread each
+    request_queue_size = 128
+
+    def __init__(self, address, api, workers=DEFAULT_WORKERS):
+        super().__init__(address, ApiRequestHandler)
+        self.api = api
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ringo-api")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ringo.api", description="Serve Ringo Radar data over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="worker threads, also the number of keep-alive connections served at once")
+    parser.add_argument("--database", default=DATABASE_PATH)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    api = RadarApi(RadarEngine(args.database))
+    # Pools, percentiles and the search index are built before the first request
+    api.engine.percentile_engine(DEFAULT_MIN_MINUTES)
+    api.search_index()
+    server = ApiServer((args.host, args.port), api, args.workers)
+    logger.info("Serving %s on http://%s:%d with %d workers", args.database, args.host, args.port, args.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
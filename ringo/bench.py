@@ -0,0 +1,306 @@
+# Ringo Radar - benchmark suite - code by ringokakiage #
+#
+#   python -m ringo.bench --scale 1 --scale 10 --scale 100 --out bench.json
+#   python -m ringo.bench --soak 5000 --memory-budget-mb 64 --out soak.json
+#
+# Times every stage of the pipeline, from loading the data to drawing the radar, on the
+# real database (scale 1) and on synthetic datasets with N times its rows. Synthetic rows
+# are copies of the real ones moved to cloned leagues and teams ("Boca Juniors #2"), so
+# league, team and position proportions stay the same, with new ids, recombined player
+# names, and jittered minutes and metrics. Results are JSON, to compare between commits.
+#
+# --soak renders thousands of radars through one RadarEngine, the way a long-running server
+# does (random players, thresholds, scopes and formats), and samples the process RSS, the
+# memory budget and the open figures along the way. Memory should stay flat after warm-up.
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from ringo.data import DATABASE_PATH, ID_COLUMN, METRIC_COLUMNS, SCHEMA, read_database_csv  # noqa: E402
+from ringo.engine import SCOPE_ALL, SCOPE_LEAGUE, VALUE_DISPLAYS, RadarEngine  # noqa: E402
+from ringo.export import select_jobs  # noqa: E402
+from ringo.memory import MemoryBudget  # noqa: E402
+from ringo.percentiles import MinutesPercentileIndex, PercentileEngine  # noqa: E402
+from ringo.plot import RadarError, closing_figure, compute_pizza_values, create_pizza_plot  # noqa: E402
+from ringo.positions import create_position_dfs, normalize_positions, position_map  # noqa: E402
+from ringo.search import NameIndex  # noqa: E402
+from ringo.snapshot import load_snapshot, write_snapshot  # noqa: E402
+from ringo.template import RadarTemplate  # noqa: E402
+
+BENCH_MIN_MINUTES = 500
+
+# Soak renders: mostly PNGs from the template, every SOAK_VECTOR_EVERY-th one is an SVG
+# drawn as a full figure, so figure disposal is part of the run too
+SOAK_VECTOR_EVERY = 10
+SOAK_SAMPLES = 20
+
+
+def synthetic_dataset(base, scale, seed=0):
+    # base is the raw database (pd.read_csv(path, index_col=0)), the result has scale times its rows
+    rng = np.random.default_rng(seed)
+    id_step = int(base[ID_COLUMN].max()) + 1
+    copies = [base]
+    for i in range(1, scale):
+        suffix = f" #{i + 1}"
+        names = base["Player"].str.split(" ", n=1)
+        first_names = names.str[0].to_numpy()[rng.permutation(len(base))]
+        last_names = names.str[1].fillna("").to_numpy()
+        copy = base.assign(**{
+            ID_COLUMN: base[ID_COLUMN] + i * id_step,
+            "Player": pd.Series(first_names + " " + last_names, index=base.index).str.strip(),
+            "League": base["League"] + suffix,
+            "Team within selected timeframe": base["Team within selected timeframe"] + suffix,
+            "Minutes played": (base["Minutes played"] * rng.uniform(0.8, 1.2, len(base))).round().astype(int),
+            **{col: base[col] * rng.lognormal(0.0, 0.1, len(base)) for col in METRIC_COLUMNS},
+        })
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def time_stage(fn, repeat=1):
+    # Seconds of each call, fn's result of the last call is returned along with the stats
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    stats = {
+        "repeat": repeat,
+        "min_s": min(times),
+        "median_s": float(np.median(times)),
+        "mean_s": float(np.mean(times)),
+    }
+    return stats, result
+
+
+def sample_players(position_dfs, n, seed=0):
+    # n player_info tuples spread over every position pool
+    rng = np.random.default_rng(seed)
+    per_pool = max(1, n // len(position_dfs))
+    sample = {
+        key: pool.iloc[rng.choice(len(pool), min(per_pool, len(pool)), replace=False)]
+        for key, pool in position_dfs.items() if len(pool)
+    }
+    jobs = select_jobs(sample, list(sample))
+    return [(job["league"], job["team"], job["player"], job["position"]) for job in jobs][:n]
+
+
+def search_queries(df, n, seed=0):
+    # Prefixes, last names and inner substrings of real names
+    rng = np.random.default_rng(seed)
+    names = df["Player"].drop_duplicates().to_numpy()[rng.choice(df["Player"].nunique(), n)]
+    queries = []
+    for i, name in enumerate(names):
+        name = str(name)
+        if i % 3 == 0:
+            queries.append(name[:4])
+        elif i % 3 == 1:
+            queries.append(name.split(" ")[-1])
+        else:
+            queries.append(name[1:5])
+    return queries
+
+
+def render_png(player_info, position_dfs, percentile_engine):
+    fig, ax = create_pizza_plot(player_info, position_dfs, "metrics", percentile_engine)
+    with closing_figure(fig):
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", bbox_inches="tight", dpi=200)
+    return buffer.getvalue()
+
+
+def bench_dataset(csv_path, workdir, repeat=3, players=50, queries=200, renders=5):
+    stages = {}
+
+    stats, raw = time_stage(lambda: pd.read_csv(csv_path, index_col=0), repeat)
+    stages["read_csv"] = stats
+    stats, _ = time_stage(lambda: normalize_positions(raw, position_map), repeat)
+    stages["normalize_positions"] = stats
+    stats, df = time_stage(lambda: read_database_csv(csv_path), repeat)
+    stages["csv_load"] = stats
+
+    snapshot_dir = os.path.join(workdir, os.path.basename(csv_path) + ".snapshot")
+    stats, _ = time_stage(lambda: write_snapshot(df, snapshot_dir, "bench", SCHEMA), 1)
+    stages["snapshot_write"] = stats
+    stats, snapshot_df = time_stage(lambda: load_snapshot(snapshot_dir), repeat)
+    stages["snapshot_load"] = stats
+    # Memory-mapped columns are only read when used, the first pass pays for it
+    stats, _ = time_stage(lambda: create_position_dfs(snapshot_df, BENCH_MIN_MINUTES), 1)
+    stages["snapshot_first_pools"] = stats
+
+    stats, position_dfs = time_stage(lambda: create_position_dfs(df, BENCH_MIN_MINUTES), repeat)
+    stages["create_position_dfs"] = stats
+
+    stats, index = time_stage(lambda: NameIndex(df), repeat)
+    stages["name_index_build"] = stats
+    query_list = search_queries(df, queries)
+    stats, _ = time_stage(lambda: [index.search(query) for query in query_list], repeat)
+    stages["name_search"] = dict(stats, calls=len(query_list))
+
+    player_infos = sample_players(position_dfs, players)
+
+    def pizza_values(engine):
+        return [compute_pizza_values(info, engine.position_dfs, "metrics", engine) for info in player_infos]
+
+    # Fresh engine every time: sorting the pools is part of the first radar's cost
+    stats, _ = time_stage(lambda: pizza_values(PercentileEngine(position_dfs)), repeat)
+    stages["percentiles"] = dict(stats, calls=len(player_infos))
+    stats, minutes_index = time_stage(lambda: MinutesPercentileIndex(create_position_dfs(df, 0)), repeat)
+    stages["minutes_index_build"] = stats
+    pizza_values(minutes_index.at(BENCH_MIN_MINUTES))  # trees are built lazily, keep them out of the timing
+    # Players come from the 500 minutes pools, so any threshold up to 500 still has them
+    thresholds = np.random.default_rng(0).integers(300, BENCH_MIN_MINUTES + 1, len(player_infos)).tolist()
+    stats, _ = time_stage(lambda: [
+        compute_pizza_values(info, view.position_dfs, "metrics", view)
+        for info, view in ((info, minutes_index.at(m)) for info, m in zip(player_infos, thresholds))
+    ], repeat)
+    stages["percentiles_any_min_minutes"] = dict(stats, calls=len(player_infos))
+
+    engine = PercentileEngine(position_dfs)
+    render_infos = player_infos[:renders]
+    render_png(render_infos[0], position_dfs, engine)  # fonts and matplotlib warm up
+    stats, _ = time_stage(lambda: [render_png(info, position_dfs, engine) for info in render_infos], repeat)
+    stages["render_png"] = dict(stats, calls=len(render_infos), figures=True)
+    # Same radars on the pre-drawn template, percentiles included like in render_png
+    template = RadarTemplate("metrics", 200)
+    try:
+        stats, _ = time_stage(lambda: [
+            template.render_png(info, compute_pizza_values(info, position_dfs, "metrics", engine))
+            for info in render_infos
+        ], repeat)
+    finally:
+        template.close()
+    stages["render_png_template"] = dict(stats, calls=len(render_infos), figures=True)
+
+    for stage in stages.values():
+        if "calls" in stage:
+            stage["per_call_ms"] = stage["median_s"] / stage["calls"] * 1000
+        if stage.pop("figures", False):
+            stage["figures_per_s"] = stage["calls"] / stage["median_s"]
+    return {"rows": int(df.shape[0]), "stages": stages}
+
+
+def soak(database=DATABASE_PATH, renders=5000, memory_budget_mb=64, dpi=100, seed=0):
+    # RSS, memory budget and open figures every renders / SOAK_SAMPLES radars
+    engine = RadarEngine(database, memory_budget=MemoryBudget(memory_budget_mb * 1024 * 1024))
+    jobs = select_jobs(engine.position_dfs(0), list(engine.position_dfs(0)))
+    player_infos = [(job["league"], job["team"], job["player"], job["position"]) for job in jobs]
+    rng = np.random.default_rng(seed)
+    every = max(1, renders // SOAK_SAMPLES)
+    samples = []
+    errors = 0
+    start = time.perf_counter()
+    for i in range(1, renders + 1):
+        player_info = player_infos[rng.integers(len(player_infos))]
+        min_minutes = int(rng.integers(300, 801))
+        scope = SCOPE_LEAGUE if rng.random() < 0.5 else SCOPE_ALL
+        value_display = VALUE_DISPLAYS[int(rng.integers(len(VALUE_DISPLAYS)))]
+        image_format = "svg" if i % SOAK_VECTOR_EVERY == 0 else "png"
+        try:
+            engine.render_image(player_info, scope, min_minutes, value_display, "metrics", image_format, dpi)
+        except RadarError:
+            # Below min_minutes in that pool
+            errors += 1
+        if i % every == 0 or i == renders:
+            usage = engine.memory_usage()
+            samples.append({
+                "renders": i,
+                "elapsed_s": time.perf_counter() - start,
+                "rss_mb": usage["rss_bytes"] / 1024 / 1024 if usage["rss_bytes"] is not None else None,
+                "budget_mb": usage["budget"]["size_bytes"] / 1024 / 1024,
+                "budget_evictions": usage["budget"]["evictions"],
+                "open_figures": usage["open_figures"],
+            })
+            print(f"soak {i}/{renders}: {samples[-1]}", file=sys.stderr)
+
+    # Growth after warm-up (first quarter of the run: fonts, templates, pools)
+    rss = [sample["rss_mb"] for sample in samples if sample["rss_mb"] is not None]
+    warm = rss[len(rss) // 4:] if rss else []
+    return {
+        "renders": renders,
+        "errors": errors,
+        "memory_budget_mb": memory_budget_mb,
+        "dpi": dpi,
+        "renders_per_s": renders / (time.perf_counter() - start),
+        "rss_growth_after_warmup_mb": warm[-1] - warm[0] if warm else None,
+        "memory_usage": engine.memory_usage(),
+        "samples": samples,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(database=DATABASE_PATH, scales=(1,), repeat=3, seed=0):
+    results = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "database": database,
+        "datasets": {},
+    }
+    base = pd.read_csv(database, index_col=0)
+    with tempfile.TemporaryDirectory(prefix="ringo_bench_") as workdir:
+        for scale in scales:
+            if scale == 1:
+                csv_path = database
+            else:
+                csv_path = os.path.join(workdir, f"synthetic_x{scale}.csv")
+                synthetic_dataset(base, scale, seed).to_csv(csv_path)
+            print(f"scale {scale}: {csv_path}", file=sys.stderr)
+            results["datasets"][f"x{scale}"] = dict(scale=scale, **bench_dataset(csv_path, workdir, repeat))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ringo.bench", description="Benchmark the Ringo Radar pipeline")
+    parser.add_argument("--database", default=DATABASE_PATH)
+    parser.add_argument("--scale", type=int, action="append",
+                        help="dataset size in multiples of the database, can be repeated (default: 1, 10 and 100)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of every stage, the median is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="JSON file (default: stdout)")
+    parser.add_argument("--soak", type=int, metavar="RENDERS",
+                        help="render this many radars through one engine and sample memory instead")
+    parser.add_argument("--memory-budget-mb", type=int, default=64, help="memory budget of the soak engine")
+    parser.add_argument("--dpi", type=int, default=100, help="resolution of the soak radars")
+    args = parser.parse_args(argv)
+
+    if args.soak:
+        results = dict(created_at=datetime.now(timezone.utc).isoformat(timespec="seconds"), commit=git_commit(),
+                       database=args.database, soak=soak(args.database, args.soak, args.memory_budget_mb, args.dpi,
+                                                         args.seed))
+    else:
+        results = run(args.database, args.scale or [1, 10, 100], args.repeat, args.seed)
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
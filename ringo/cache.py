@@ -0,0 +1,126 @@
+# Ringo Radar - caches shared by every session - code by ringokakiage #
+import threading
+from collections import OrderedDict
+
+# Rendered radars kept in memory by default
+RENDER_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+class SizedCache:
+    # Thread safe LRU cache bounded by the total size of its values, sizeof(value) bytes
+    # (len by default). The least recently used values are evicted first. max_bytes None is
+    # no limit of its own; with a budget (ringo.memory.MemoryBudget) the entries also count
+    # against the budget, which can evict them to make room for the entries of other caches.
+    # A value larger than max_bytes or than the whole budget is not cached.
+    def __init__(self, max_bytes=None, budget=None, name="cache", sizeof=len):
+        self.max_bytes = max_bytes
+        self.budget = budget
+        self.name = name
+        self.sizeof = sizeof
+        self._items = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            if self.budget is not None:
+                self.budget.touch(self, key)
+            self.hits += 1
+            return value
+
+    def _pop(self, key):
+        # Under the lock
+        value = self._items.pop(key, None)
+        if value is not None:
+            self.size_bytes -= self._sizes.pop(key)
+        return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        if self.budget is not None and size > self.budget.max_bytes:
+            return
+        victims = []
+        with self._lock:
+            self._pop(key)
+            self._items[key] = value
+            self._sizes[key] = size
+            self.size_bytes += size
+            while self.max_bytes is not None and self.size_bytes > self.max_bytes:
+                evicted_key = next(iter(self._items))
+                self._pop(evicted_key)
+                self.evictions += 1
+                if self.budget is not None:
+                    self.budget.release(self, evicted_key)
+            if self.budget is not None:
+                victims = self.budget.charge(self, key, size)
+        if victims:
+            self.budget.evict(victims)
+
+    def get_or_render(self, key, render):
+        # render() returns the value to cache, or None when there is nothing to show (not cached)
+        value = self.get(key)
+        if value is None:
+            value = render()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def evicted(self, key):
+        # Called by the budget once it dropped key, unless key was put again since
+        with self._lock:
+            if self.budget.is_charged(self, key):
+                return
+            if self._pop(key) is not None:
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            if self._pop(key) is not None and self.budget is not None:
+                self.budget.release(self, key)
+
+    def items(self):
+        with self._lock:
+            return list(self._items.items())
+
+    def clear(self):
+        with self._lock:
+            if self.budget is not None:
+                for key in self._items:
+                    self.budget.release(self, key)
+            self._items.clear()
+            self._sizes.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class RenderCache(SizedCache):
+    # Rendered images (bytes)
+    def __init__(self, max_bytes=RENDER_CACHE_MAX_BYTES, budget=None, name="images"):
+        super().__init__(max_bytes, budget, name)
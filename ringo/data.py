@@ -0,0 +1,179 @@
+# Ringo Radar - Wyscout database loading - code by ringokakiage #
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+from ringo.plot import pizza_var_names_dict
+from ringo.positions import POSITION_COLUMNS, normalize_positions, position_map
+from ringo.snapshot import (
+    StaleSnapshotError, file_sha256, load_snapshot, read_snapshot_meta, snapshot_path, write_snapshot,
+)
+from ringo.timing import stage
+
+DATABASE_PATH = "database_jan25.csv"
+
+# Floats are parsed exactly: a database read and written back keeps every digit
+CSV_FLOAT_PRECISION = "round_trip"
+
+ID_COLUMN = "Wyscout id"
+
+# The six Ringo metrics
+METRIC_COLUMNS = ['wPwC', 'Aerial impact', 'wSwC', 'wAwC', 'wDpwC', 'wDcwC']
+
+# Low cardinality text columns, stored as categoricals
+CATEGORY_COLUMNS = ['League', 'Team within selected timeframe', 'Position'] + POSITION_COLUMNS
+
+# Columns read whatever the plot type: who the player is, the filters and the positions
+BASE_COLUMNS = [ID_COLUMN, 'Player', 'Team within selected timeframe', 'League', 'Age', 'Minutes played',
+                'Position'] + POSITION_COLUMNS
+BASE_DTYPES = {ID_COLUMN: 'int64', 'Age': 'float64', 'Minutes played': 'int64',
+               **{col: 'str' for col in ['Player'] + CATEGORY_COLUMNS}}
+
+# Plot types whose columns are loaded (RINGO_PLOT_TYPES=metrics,gen adds the general stats),
+# the columns of the others are not read and drawing them raises SchemaError
+PLOT_TYPES = [plot_type.strip() for plot_type in os.environ.get("RINGO_PLOT_TYPES", "metrics").split(",")]
+
+# Embedded in every snapshot, a snapshot built with another schema is rebuilt
+SCHEMA = {
+    "id_column": ID_COLUMN,
+    "metric_columns": METRIC_COLUMNS,
+    "position_columns": POSITION_COLUMNS,
+    "category_columns": CATEGORY_COLUMNS,
+    "position_map": position_map,
+}
+
+
+class SchemaError(ValueError):
+    # The database lacks columns a plot type needs, or the plot type is not loaded
+    pass
+
+
+def plot_type_columns(plot_type):
+    if plot_type not in pizza_var_names_dict:
+        raise SchemaError(f"Unknown plot type {plot_type!r}, expected one of {list(pizza_var_names_dict)}")
+    return pizza_var_names_dict[plot_type]
+
+
+def database_columns(plot_types=PLOT_TYPES):
+    # Columns read from the database for plot_types, in no particular order
+    columns = list(BASE_COLUMNS)
+    for plot_type in plot_types:
+        columns += [col for col in plot_type_columns(plot_type) if col not in columns]
+    return columns
+
+
+def column_dtypes(columns):
+    # Metrics of every plot type are float32
+    return {col: BASE_DTYPES.get(col, 'float32') for col in columns}
+
+
+def check_columns(source, available, plot_types=PLOT_TYPES):
+    # Raises SchemaError listing what each plot type misses in source
+    available = set(available)
+    missing = {}
+    base_missing = [col for col in BASE_COLUMNS if col not in available]
+    if base_missing:
+        missing["every plot type"] = base_missing
+    for plot_type in plot_types:
+        plot_missing = [col for col in plot_type_columns(plot_type) if col not in available]
+        if plot_missing:
+            missing[plot_type] = plot_missing
+    if missing:
+        details = "; ".join(f"{name}: {columns}" for name, columns in missing.items())
+        raise SchemaError(f"{source} lacks columns ({details})")
+
+
+def check_plot_type(plot_type, plot_types=PLOT_TYPES):
+    plot_type_columns(plot_type)
+    if plot_type not in plot_types:
+        raise SchemaError(f"Plot type {plot_type!r} is not loaded, add it to RINGO_PLOT_TYPES "
+                          f"(currently {','.join(plot_types)})")
+
+
+def file_columns(path=DATABASE_PATH):
+    # Column names of the CSV (its header only), or of the snapshot when the CSV is gone
+    if os.path.exists(path):
+        return list(pd.read_csv(path, index_col=0, nrows=0).columns)
+    meta = read_snapshot_meta(snapshot_path(path))
+    if meta is None:
+        raise FileNotFoundError(f"No database at {path}")
+    return [column["name"] for column in meta["columns"]]
+
+
+def validate_database(path=DATABASE_PATH, plot_types=PLOT_TYPES):
+    # Cheap check before any work: plot types exist, are loaded and the file has their columns
+    for plot_type in plot_types:
+        check_plot_type(plot_type)
+    check_columns(path, file_columns(path), plot_types)
+
+
+@lru_cache(maxsize=None)
+def load_database(path=DATABASE_PATH):
+    # Loaded once per process and shared by every session, so it must never be
+    # mutated: filter or copy it instead.
+    return read_database(path)
+
+
+def read_database(path=DATABASE_PATH, plot_types=PLOT_TYPES):
+    # Only the columns of plot_types: a fresh snapshot is memory-mapped, otherwise the CSV is parsed
+    columns = database_columns(plot_types)
+    if not os.path.exists(path):
+        check_columns(path, file_columns(path), plot_types)
+        return load_snapshot(snapshot_path(path), schema=SCHEMA, columns=columns)
+    source_sha256 = file_sha256(path)
+    try:
+        return load_snapshot(snapshot_path(path), source_sha256, SCHEMA, columns)
+    except StaleSnapshotError:
+        return read_database_csv(path, plot_types)
+
+
+@lru_cache(maxsize=None)
+def database_hash(path=DATABASE_PATH):
+    # Identifies the version of the data, part of every cache key
+    if not os.path.exists(path):
+        meta = read_snapshot_meta(snapshot_path(path))
+        return meta["source_sha256"] if meta else None
+    return file_sha256(path)
+
+
+def read_database_csv(path=DATABASE_PATH, plot_types=PLOT_TYPES):
+    # The header is checked first, then only the needed columns are parsed, with their types
+    header = pd.read_csv(path, nrows=0).columns
+    columns = database_columns(plot_types)
+    check_columns(path, header[1:], plot_types)
+    df = pd.read_csv(path, index_col=0, usecols=[0] + [header.get_loc(col) for col in columns],
+                     dtype=column_dtypes(columns), float_precision=CSV_FLOAT_PRECISION)
+    with stage("normalize_positions"):
+        df = normalize_positions(df, position_map)
+    return freeze_frame(df)
+
+
+def build_snapshot(path=DATABASE_PATH):
+    # Build step for new exports: python -m ringo.snapshot database.csv
+    snapshot_dir = write_snapshot(read_database_csv(path), snapshot_path(path), file_sha256(path), SCHEMA)
+    load_database.cache_clear()
+    return snapshot_dir
+
+
+def snapshot_is_fresh(path=DATABASE_PATH):
+    meta = read_snapshot_meta(snapshot_path(path))
+    return (meta is not None and meta["source_sha256"] == file_sha256(path) and meta["schema"] == SCHEMA
+            and set(database_columns()) <= {column["name"] for column in meta["columns"]})
+
+
+def freeze_frame(df):
+    # Compact dtypes and read-only buffers, so an accidental write raises instead
+    # of leaking into other sessions
+    columns = {}
+    for col in df.columns:
+        if col in CATEGORY_COLUMNS:
+            categorical = pd.Categorical(df[col])
+            codes = categorical.codes.copy()
+            codes.flags.writeable = False
+            columns[col] = pd.Categorical.from_codes(codes, categorical.categories)
+        else:
+            values = df[col].to_numpy(copy=True)
+            values.flags.writeable = False
+            columns[col] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
@@ -0,0 +1,290 @@
+# Ringo Radar - radar engine, usable without Streamlit - code by ringokakiage #
+#
+#   engine = RadarEngine()
+#   player = ("ARG Copa de la Liga", "Boca Juniors", "K. Zenón", "LW")  # league, team, player, position
+#   engine.percentiles(player, SCOPE_LEAGUE, min_minutes=600)
+#   png = engine.render_png(player)
+import io
+import os
+import threading
+
+import matplotlib.pyplot as plt
+
+from ringo.cache import RenderCache, SizedCache
+from ringo.data import DATABASE_PATH, check_plot_type, database_hash, load_database
+from ringo.ingest import changed_positions_since, read_versions
+from ringo.lookup import PlayerLookup
+from ringo.matrix import PercentileMatrix, percentile_matrix_path
+from ringo.memory import default_budget, frame_bytes, resident_bytes
+from ringo.percentiles import MinutesPercentileIndex
+from ringo.plot import DEFAULT_MIN_MINUTES, RadarError, closing_figure, compute_pizza_values, create_pizza_plot
+from ringo.positions import POSITION_KEYS, create_position_dfs, position_map
+from ringo.similarity import SimilarityIndex
+from ringo.template import radar_template
+from ringo.timing import stage
+from ringo.webradar import radar_payload
+
+# Comparison scopes, same labels as the app
+SCOPE_ALL = "Toda a base de dados"
+SCOPE_LEAGUE = "Jogadores da mesma liga"
+SCOPE_ALIASES = {None: SCOPE_ALL, "all": SCOPE_ALL, "league": SCOPE_LEAGUE}
+
+VALUE_DISPLAYS = ["Percentile", "Index values"]
+
+# Columns shown next to the metric in a leaderboard
+LEADERBOARD_COLUMNS = ["Player", "Team within selected timeframe", "League", "Age", "Minutes played", "Position"]
+
+
+def normalize_scope(scope):
+    scope = SCOPE_ALIASES.get(scope, scope)
+    if scope not in (SCOPE_ALL, SCOPE_LEAGUE):
+        raise ValueError(f"Unknown comparison scope: {scope!r}")
+    return scope
+
+
+class RadarEngine:
+    # Owns the dataset, the position pools and a minutes index that gives the pools and
+    # percentiles of any min_minutes without rebuilding them. A player is always given as
+    # (league, team, player, position), the same tuple the app calls player_info. Safe to
+    # share between threads. Rendered images, the matrices and pools of each min_minutes and
+    # the percentile trees share one memory budget (ringo.memory), the one of the process
+    # unless memory_budget is given.
+    def __init__(self, database_path=DATABASE_PATH, df=None, render_cache=None, memory_budget=None,
+                 position_dfs=None, dataset_hash=None):
+        # position_dfs: pools of df without minutes threshold, when they are already built.
+        # dataset_hash: version of the database df comes from, when df was not read from it now
+        self.database_path = database_path
+        self.df = load_database(database_path) if df is None else df
+        self._base_pools = position_dfs
+        self.dataset_hash = database_hash(database_path) if dataset_hash is None else dataset_hash
+        self.memory_budget = default_budget() if memory_budget is None else memory_budget
+        self.render_cache = RenderCache(budget=self.memory_budget) if render_cache is None else render_cache
+        self._minutes_index = None
+        self._lookup = None
+        self._matrices = SizedCache(budget=self.memory_budget, name="percentile_matrices",
+                                    sizeof=lambda matrix: matrix.nbytes)
+        self._stored_matrix = None
+        self._similarity = {}
+        # Data version of each position pool, part of the render cache keys, so radars of
+        # the pools an ingestion did not touch stay cached
+        self.pool_versions = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        # Picks up the ingestions made since this engine loaded the data (python -m ringo.ingest),
+        # only the position pools they changed are rebuilt. Returns the changed position keys.
+        versions = read_versions(self.database_path)
+        if not versions or versions[-1]["dataset_sha256"] == self.dataset_hash:
+            return []
+        changed = changed_positions_since(self.database_path, self.dataset_hash)
+        if changed is None:
+            changed = list(POSITION_KEYS)
+        load_database.cache_clear()
+        database_hash.cache_clear()
+        df = load_database(self.database_path)
+        dataset_hash = database_hash(self.database_path)
+        position_dfs = create_position_dfs(df, 0)
+
+        with self._lock:
+            if self._minutes_index is not None:
+                self._minutes_index = self._minutes_index.update(position_dfs, changed)
+            self._similarity = {
+                transform: index.update(position_dfs, changed) for transform, index in self._similarity.items()
+            }
+            for min_minutes, matrix in self._matrices.items():
+                self._matrices.put(min_minutes, matrix.update(df, changed, dataset_hash))
+            self._stored_matrix = None
+            self._lookup = None
+            for position_key in POSITION_KEYS:
+                if position_key in changed:
+                    self.pool_versions[position_key] = dataset_hash
+                else:
+                    self.pool_versions.setdefault(position_key, self.dataset_hash)
+            self.df = df
+            self.dataset_hash = dataset_hash
+        return changed
+
+    def minutes_index(self):
+        # Pools without minutes threshold, built once per dataset
+        with self._lock:
+            if self._minutes_index is None:
+                position_dfs = create_position_dfs(self.df, 0) if self._base_pools is None else self._base_pools
+                self._minutes_index = MinutesPercentileIndex(position_dfs, budget=self.memory_budget)
+                self._base_pools = None
+            return self._minutes_index
+
+    def player_lookup(self):
+        # League -> team -> player -> positions, and the player's row in every pool, built once per dataset
+        index = self.minutes_index()
+        with self._lock:
+            if self._lookup is None or self._lookup.position_dfs is not index.position_dfs:
+                self._lookup = PlayerLookup(self.df, index.position_dfs)
+            return self._lookup
+
+    def percentile_engine(self, min_minutes=DEFAULT_MIN_MINUTES):
+        with stage("position_dfs"):
+            return self.minutes_index().at(min_minutes)
+
+    def position_dfs(self, min_minutes=DEFAULT_MIN_MINUTES):
+        return self.percentile_engine(min_minutes).position_dfs
+
+    def stored_percentile_matrix(self):
+        # Matrix built next to the dataset (python -m ringo.matrix), None when missing or stale
+        with self._lock:
+            if self._stored_matrix is None:
+                path = percentile_matrix_path(self.database_path)
+                matrix = PercentileMatrix.load(path) if os.path.exists(path) else None
+                self._stored_matrix = matrix if matrix is not None and matrix.dataset_hash == self.dataset_hash else False
+            return self._stored_matrix or None
+
+    def percentile_matrix(self, min_minutes=DEFAULT_MIN_MINUTES):
+        # Stored matrix when it has min_minutes, otherwise that threshold is computed once in memory
+        stored = self.stored_percentile_matrix()
+        if stored is not None and stored.has_threshold(min_minutes):
+            return stored
+        with self._lock:
+            return self._matrices.get_or_render(
+                min_minutes, lambda: PercentileMatrix.build(self.df, [min_minutes], dataset_hash=self.dataset_hash)
+            )
+
+    def leaderboard(self, position_key, metric, scope=SCOPE_ALL, min_minutes=DEFAULT_MIN_MINUTES, league=None, top=20):
+        # Players of a position pool sorted by their percentile in one metric, best first
+        matrix = self.percentile_matrix(min_minutes)
+        if metric not in matrix.metrics:
+            raise RadarError(f"Metric {metric} is not in the percentile matrix.")
+        table = matrix.table(min_minutes, normalize_scope(scope) == SCOPE_LEAGUE, position_key)
+        if table is None:
+            raise RadarError(f"No data available for position: {position_key}")
+        row_ids, percentiles = table
+        board = self.df.loc[row_ids, LEADERBOARD_COLUMNS + [metric]]
+        board = board.assign(Percentile=percentiles[:, matrix.metrics.index(metric)])
+        if league is not None:
+            board = board[board["League"] == league]
+        return board.sort_values(["Percentile", metric], ascending=False).head(top)
+
+    def similarity_index(self, transform="zscore"):
+        # Built over the pools without minutes threshold, once per dataset
+        with self._lock:
+            index = self._similarity.get(transform)
+            if index is None:
+                index = SimilarityIndex(create_position_dfs(self.df, 0), transform=transform)
+                self._similarity[transform] = index
+            return index
+
+    def similar_players(self, player_info, k=10, league=None, min_age=None, max_age=None, min_minutes=None,
+                        transform="zscore"):
+        # The k most similar players of the same position pool, closest first
+        position_key = position_map.get(player_info[3], player_info[3])
+        index = self.similarity_index(transform)
+        pool = index.pool(position_key)
+        rows = self.player_rows(player_info)
+        rows = rows[rows.index.isin(pool.index)]
+        if rows.empty:
+            raise RadarError(f"No data found for player: {player_info[2]} in team: {player_info[1]} "
+                             f"under position: {position_key}")
+        return index.similar(position_key, rows.index[0], k, league, min_age, max_age, min_minutes)
+
+    def player_rows(self, player_info):
+        # Every row of the player in the database, whatever the minutes played
+        return self.player_lookup().player_rows(player_info)
+
+    def player_minutes(self, player_info):
+        # Minutes played with the selected position as primary position, None if unknown
+        player_position = player_info[3]
+        rows = self.player_rows(player_info)
+        rows = rows[rows["Primary position"] == position_map.get(player_position, player_position)]
+        return None if rows.empty else int(rows["Minutes played"].iloc[0])
+
+    def pizza_values(self, player_info, scope=SCOPE_ALL, min_minutes=DEFAULT_MIN_MINUTES, plot_type="metrics"):
+        check_plot_type(plot_type)
+        engine = self.percentile_engine(min_minutes)
+        comparison_league = player_info[0] if normalize_scope(scope) == SCOPE_LEAGUE else None
+        return compute_pizza_values(player_info, engine.position_dfs, plot_type, engine, comparison_league,
+                                    self.stored_percentile_matrix(), min_minutes, self.player_lookup())
+
+    def percentiles(self, player_info, scope=SCOPE_ALL, min_minutes=DEFAULT_MIN_MINUTES, plot_type="metrics"):
+        # {metric: percentile}, raises RadarError when the player can't be compared
+        pizza_values = self.pizza_values(player_info, scope, min_minutes, plot_type)
+        if pizza_values is None:
+            raise RadarError(f"Positions {player_info[3]} are not categorized.")
+        return dict(zip(pizza_values["columns"], pizza_values["percentiles"].tolist()))
+
+    def radar_payload(self, player_info, scope=SCOPE_ALL, min_minutes=DEFAULT_MIN_MINUTES, value_display="Percentile",
+                      plot_type="metrics"):
+        # JSON payload of the radar for the browser (ringo.webradar), no matplotlib involved
+        if value_display not in VALUE_DISPLAYS:
+            raise ValueError(f"value_display can only be one of {VALUE_DISPLAYS}, got {value_display!r}")
+        pizza_values = self.pizza_values(player_info, scope, min_minutes, plot_type)
+        if pizza_values is None:
+            raise RadarError(f"Positions {player_info[3]} are not categorized.")
+        return radar_payload(player_info, pizza_values, plot_type, value_display, min_minutes)
+
+    def render(self, player_info, scope=SCOPE_ALL, min_minutes=DEFAULT_MIN_MINUTES, value_display="Percentile",
+               plot_type="metrics"):
+        # (fig, ax), closing the figure is up to the caller
+        if value_display not in VALUE_DISPLAYS:
+            raise ValueError(f"value_display can only be one of {VALUE_DISPLAYS}, got {value_display!r}")
+        check_plot_type(plot_type)
+        engine = self.percentile_engine(min_minutes)
+        comparison_league = player_info[0] if normalize_scope(scope) == SCOPE_LEAGUE else None
+        result = create_pizza_plot(player_info, engine.position_dfs, plot_type, engine, comparison_league,
+                                   value_display, min_minutes, self.stored_percentile_matrix(), self.player_lookup())
+        if result is None:
+            raise RadarError(f"Positions {player_info[3]} are not categorized.")
+        return result
+
+    def render_key(self, player_info, scope=SCOPE_ALL, min_minutes=DEFAULT_MIN_MINUTES, value_display="Percentile",
+                   plot_type="metrics", image_format="png"):
+        player_league, player_team, player_name, player_position = player_info[:4]
+        player_ids = self.player_rows(player_info)["Wyscout id"]
+        wyscout_id = int(player_ids.iloc[0]) if not player_ids.empty else player_name
+        position_key = position_map.get(player_position, player_position)
+        return (wyscout_id, player_team, player_league, position_key, normalize_scope(scope),
+                min_minutes, value_display, plot_type, self.pool_versions.get(position_key, self.dataset_hash),
+                image_format)
+
+    def render_template_png(self, player_info, scope=SCOPE_ALL, min_minutes=DEFAULT_MIN_MINUTES,
+                            value_display="Percentile", plot_type="metrics", dpi=200):
+        # PNG drawn on the pre-drawn template of plot_type (ringo.template), not cached
+        if value_display not in VALUE_DISPLAYS:
+            raise ValueError(f"value_display can only be one of {VALUE_DISPLAYS}, got {value_display!r}")
+        pizza_values = self.pizza_values(player_info, scope, min_minutes, plot_type)
+        if pizza_values is None:
+            raise RadarError(f"Positions {player_info[3]} are not categorized.")
+        with stage("figure"):
+            return radar_template(plot_type, dpi).render_png(player_info, pizza_values, value_display, min_minutes)
+
+    def render_image(self, player_info, scope=SCOPE_ALL, min_minutes=DEFAULT_MIN_MINUTES, value_display="Percentile",
+                     plot_type="metrics", image_format="png", dpi=200):
+        # Image bytes, served from the render cache when the same radar was already drawn
+        def render():
+            if image_format == "png":
+                return self.render_template_png(player_info, scope, min_minutes, value_display, plot_type, dpi)
+            fig, ax = self.render(player_info, scope, min_minutes, value_display, plot_type)
+            with closing_figure(fig):
+                buffer = io.BytesIO()
+                # Same savefig settings as st.pyplot
+                with stage("savefig"):
+                    fig.savefig(buffer, format=image_format, bbox_inches="tight", dpi=dpi)
+            return buffer.getvalue()
+
+        key = self.render_key(player_info, scope, min_minutes, value_display, plot_type, image_format) + (dpi,)
+        return self.render_cache.get_or_render(key, render)
+
+    def render_png(self, player_info, scope=SCOPE_ALL, min_minutes=DEFAULT_MIN_MINUTES, value_display="Percentile",
+                   plot_type="metrics", dpi=200):
+        return self.render_image(player_info, scope, min_minutes, value_display, plot_type, "png", dpi)
+
+    def memory_usage(self):
+        # What this engine holds and what the process uses, in bytes
+        index, lookup = self._minutes_index, self._lookup
+        stored = self._stored_matrix or None
+        return {
+            "rss_bytes": resident_bytes(),
+            "dataset_bytes": frame_bytes(self.df),
+            "base_pool_bytes": sum(frame_bytes(pool) for pool in index.position_dfs.values()) if index else 0,
+            "stored_matrix_bytes": stored.nbytes if stored is not None else 0,
+            "lookup_players": len(lookup) if lookup is not None else 0,
+            "open_figures": len(plt.get_fignums()),
+            "budget": self.memory_budget.usage(),
+        }
@@ -0,0 +1,258 @@
+# Ringo Radar - batch radar export - code by ringokakiage #
+#
+# Renders the radar of every player of a league, team or shortlist without Streamlit:
+#
+#   python -m ringo.export --league "ARG Copa de la Liga" --position CB --min-minutes 500
+#
+# Every radar is written to the output directory and recorded in manifest.jsonl as soon
+# as it is done. Running the same command again skips what is already in the manifest,
+# so an interrupted export resumes where it stopped. File names end with a hash of the
+# radar's settings, so runs with another scope or threshold never overwrite them.
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from ringo.data import DATABASE_PATH, SchemaError, validate_database
+from ringo.engine import SCOPE_ALL, SCOPE_LEAGUE, RadarEngine
+from ringo.plot import DEFAULT_MIN_MINUTES, RadarError, close_figure
+from ringo.positions import POSITION_KEYS, position_map
+
+MANIFEST_FILE = "manifest.jsonl"
+SCOPES = {"all": SCOPE_ALL, "league": SCOPE_LEAGUE}
+VALUE_DISPLAYS = {"percentile": "Percentile", "index": "Index values"}
+
+# Loaded once in every worker process
+_worker = {}
+
+
+def slugify(text):
+    ascii_text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return re.sub(r"[^A-Za-z0-9]+", "_", ascii_text).strip("_") or "player"
+
+
+def raw_position_for(position_string, position_key):
+    # First position of the player (e.g. "LCB" in "LB, LCB") that belongs to the pool
+    for pos in str(position_string).split(","):
+        if position_map.get(pos.strip()) == position_key:
+            return pos.strip()
+    return None
+
+
+def read_shortlist(path):
+    # Wyscout ids, one per line or in a "Wyscout id" column
+    if path.endswith(".csv"):
+        return set(pd.read_csv(path)["Wyscout id"].astype(int))
+    with open(path, encoding="utf-8") as f:
+        return {int(line.strip()) for line in f if line.strip()}
+
+
+def select_jobs(position_dfs, position_keys, league=None, team=None, shortlist=None):
+    jobs = []
+    for position_key in position_keys:
+        pool = position_dfs[position_key]
+        if league:
+            pool = pool[pool["League"] == league]
+        if team:
+            pool = pool[pool["Team within selected timeframe"] == team]
+        if shortlist is not None:
+            pool = pool[pool["Wyscout id"].isin(shortlist)]
+        for row_id, row in pool.iterrows():
+            position = raw_position_for(row["Position"], position_key)
+            if position is None:
+                continue
+            jobs.append({
+                "row_id": row_id,
+                "wyscout_id": int(row["Wyscout id"]),
+                "player": row["Player"],
+                "team": row["Team within selected timeframe"],
+                "league": row["League"],
+                "position": position,
+                "position_key": position_key,
+            })
+    return jobs
+
+
+def job_key(job, settings):
+    return "|".join(str(part) for part in (
+        job["wyscout_id"], job["team"], job["league"], job["position_key"], settings["scope"],
+        settings["min_minutes"], settings["value_display"], settings["plot_type"], settings["dpi"],
+        settings["dataset_hash"],
+    ))
+
+
+def file_base_name(job):
+    # 212141_K_Zenon_Boca_Juniors_WIN_1f0c3a9e, the hash of job_key tells settings apart
+    digest = hashlib.sha256(job["key"].encode("utf-8")).hexdigest()[:8]
+    return f"{job['wyscout_id']}_{slugify(job['player'])}_{slugify(job['team'])}_{job['position_key']}_{digest}"
+
+
+def read_manifest(out_dir):
+    done = {}
+    try:
+        with open(os.path.join(out_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Last line of an interrupted run
+                    continue
+                done[record["key"]] = record
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _init_worker(database_path, min_minutes):
+    _worker["engine"] = RadarEngine(database_path)
+    _worker["engine"].percentile_engine(min_minutes)
+
+
+def render_job(job, settings):
+    player_info = (job["league"], job["team"], job["player"], job["position"], job["wyscout_id"])
+    render_args = (player_info, settings["scope"], settings["min_minutes"], settings["value_display"],
+                   settings["plot_type"])
+    try:
+        # PNG comes from the pre-drawn template, the full figure is only built for vector formats
+        png, fig = None, None
+        if "png" in settings["formats"]:
+            png = _worker["engine"].render_template_png(*render_args, settings["dpi"])
+        if any(fmt != "png" for fmt in settings["formats"]):
+            fig, ax = _worker["engine"].render(*render_args)
+    except RadarError as e:
+        return {"key": job["key"], "error": str(e)}
+
+    base_name = file_base_name(job)
+    files = []
+    try:
+        for fmt in settings["formats"]:
+            file_name = f"{base_name}.{fmt}"
+            tmp_path = os.path.join(settings["out_dir"], file_name + ".tmp")
+            if fmt == "png":
+                with open(tmp_path, "wb") as f:
+                    f.write(png)
+            else:
+                fig.savefig(tmp_path, format=fmt, bbox_inches="tight", dpi=settings["dpi"])
+            os.replace(tmp_path, os.path.join(settings["out_dir"], file_name))
+            files.append(file_name)
+    finally:
+        # Closed even when a write fails, workers render thousands of radars
+        if fig is not None:
+            close_figure(fig)
+    return {
+        "key": job["key"],
+        "wyscout_id": job["wyscout_id"],
+        "player": job["player"],
+        "team": job["team"],
+        "league": job["league"],
+        "position": job["position_key"],
+        "files": files,
+    }
+
+
+def export_radars(out_dir, position_keys, league=None, team=None, shortlist=None, min_minutes=DEFAULT_MIN_MINUTES,
+                  scope=SCOPES["all"], value_display=VALUE_DISPLAYS["percentile"], plot_type="metrics",
+                  formats=("png",), dpi=200, workers=None, database_path=DATABASE_PATH, log=print):
+    # An unsupported plot type fails here, before the database is loaded
+    validate_database(database_path, [plot_type])
+    os.makedirs(out_dir, exist_ok=True)
+    settings = {
+        "out_dir": out_dir,
+        "scope": scope,
+        "min_minutes": min_minutes,
+        "value_display": value_display,
+        "plot_type": plot_type,
+        "formats": list(formats),
+        "dpi": dpi,
+    }
+    engine = RadarEngine(database_path)
+    settings["dataset_hash"] = engine.dataset_hash
+    jobs = select_jobs(engine.position_dfs(min_minutes), position_keys, league, team, shortlist)
+    for job in jobs:
+        job["key"] = job_key(job, settings)
+
+    # Resume: skip radars already in the manifest whose files are still there, failed ones are retried
+    done = read_manifest(out_dir)
+    pending = [
+        job for job in jobs
+        if job["key"] not in done or "error" in done[job["key"]]
+        or not all(os.path.isfile(os.path.join(out_dir, f)) for f in done[job["key"]]["files"])
+    ]
+    log(f"{len(jobs)} radars selected, {len(jobs) - len(pending)} already exported, {len(pending)} to render")
+
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    rendered, failed = 0, 0
+    start = time.perf_counter()
+    with open(manifest_path, "a", encoding="utf-8") as manifest, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(database_path, min_minutes)) as pool:
+        if manifest.tell() > 0 and not _ends_with_newline(manifest_path):
+            # Don't glue new records to the half written line of an interrupted run
+            manifest.write("\n")
+        futures = {pool.submit(render_job, job, settings): job for job in pending}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                # One broken radar doesn't stop the batch
+                record = {"key": futures[future]["key"], "error": f"{type(e).__name__}: {e}"}
+            if "error" in record:
+                failed += 1
+                log(f"skipped {record['key']}: {record['error']}")
+            else:
+                rendered += 1
+            manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+            manifest.flush()
+    elapsed = time.perf_counter() - start
+
+    rate = rendered / elapsed if elapsed > 0 else 0.0
+    log(f"{rendered} radars rendered in {elapsed:.1f}s ({rate:.2f} radars/s), {failed} failed")
+    return {"selected": len(jobs), "rendered": rendered, "failed": failed, "seconds": elapsed, "radars_per_second": rate}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ringo.export", description="Export Ringo Radars in batch")
+    parser.add_argument("--out", default="radars", help="output directory (default: radars)")
+    parser.add_argument("--position", action="append", choices=POSITION_KEYS,
+                        help="position pool, can be repeated (default: every position)")
+    parser.add_argument("--league", help="only players of this league")
+    parser.add_argument("--team", help="only players of this team")
+    parser.add_argument("--shortlist", help="file with Wyscout ids, one per line or a CSV with a 'Wyscout id' column")
+    parser.add_argument("--min-minutes", type=int, default=DEFAULT_MIN_MINUTES)
+    parser.add_argument("--scope", choices=SCOPES, default="all", help="compare with the whole database or the same league")
+    parser.add_argument("--values", choices=VALUE_DISPLAYS, default="percentile")
+    parser.add_argument("--plot-type", default="metrics")
+    parser.add_argument("--format", action="append", choices=["png", "pdf", "svg"], help="can be repeated (default: png)")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--workers", type=int, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--database", default=DATABASE_PATH)
+    args = parser.parse_args(argv)
+
+    shortlist = read_shortlist(args.shortlist) if args.shortlist else None
+    try:
+        summary = export_radars(
+            args.out, args.position or POSITION_KEYS, league=args.league, team=args.team, shortlist=shortlist,
+            min_minutes=args.min_minutes, scope=SCOPES[args.scope], value_display=VALUE_DISPLAYS[args.values],
+            plot_type=args.plot_type, formats=args.format or ["png"], dpi=args.dpi, workers=args.workers,
+            database_path=args.database,
+        )
+    except SchemaError as e:
+        parser.error(str(e))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# Ringo Radar - fonts for the pizza plot - code by ringokakiage #
+#
+# Fonts are looked up, the first time a radar is drawn, in:
+#   1. $RINGO_FONT_DIR
+#   2. the fonts/ directory next to the app (bundled files)
+#   3. the local font cache ($RINGO_FONT_CACHE, default ~/.cache/ringo_radar/fonts)
+# and downloaded into the cache when missing, unless RINGO_OFFLINE=1. Without the files
+# and without network the radar falls back to the default matplotlib fonts.
+#
+# To prepare an offline machine: python -m ringo.fonts --dir fonts
+import logging
+import os
+import sys
+import threading
+from functools import lru_cache
+from urllib.request import urlopen
+
+from matplotlib.font_manager import FontProperties
+
+logger = logging.getLogger(__name__)
+
+FONTS = {
+    "normal": ("Roboto-Regular.ttf",
+               "https://raw.githubusercontent.com/googlefonts/roboto/main/src/hinted/Roboto-Regular.ttf"),
+    "italic": ("Roboto-Italic.ttf",
+               "https://raw.githubusercontent.com/googlefonts/roboto/main/src/hinted/Roboto-Italic.ttf"),
+    "bold": ("RobotoSlab[wght].ttf",
+             "https://raw.githubusercontent.com/google/fonts/main/apache/robotoslab/RobotoSlab[wght].ttf"),
+}
+
+# Used when the font file can't be found nor downloaded
+FALLBACK_FONTS = {
+    "normal": dict(family=["sans-serif"]),
+    "italic": dict(family=["sans-serif"], style="italic"),
+    "bold": dict(family=["serif"], weight="bold"),
+}
+
+BUNDLED_FONT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts")
+FONT_CACHE_DIR = os.environ.get("RINGO_FONT_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "ringo_radar", "fonts"))
+DOWNLOAD_TIMEOUT = 10
+
+# After a failed download no other font is downloaded, so an offline start only waits once
+_download_failed = threading.Event()
+
+
+def font_dirs():
+    dirs = [BUNDLED_FONT_DIR, FONT_CACHE_DIR]
+    if os.environ.get("RINGO_FONT_DIR"):
+        dirs.insert(0, os.environ["RINGO_FONT_DIR"])
+    return dirs
+
+
+def find_font_file(name):
+    file_name = FONTS[name][0]
+    for font_dir in font_dirs():
+        path = os.path.join(font_dir, file_name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def download_font(name, font_dir=FONT_CACHE_DIR):
+    file_name, url = FONTS[name]
+    os.makedirs(font_dir, exist_ok=True)
+    path = os.path.join(font_dir, file_name)
+    with urlopen(url, timeout=DOWNLOAD_TIMEOUT) as response:
+        content = response.read()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return path
+
+
+@lru_cache(maxsize=None)
+def get_font(name):
+    # FontProperties for "normal", "italic" or "bold", loaded on first use
+    path = find_font_file(name)
+    if path is None and os.environ.get("RINGO_OFFLINE") != "1" and not _download_failed.is_set():
+        try:
+            path = download_font(name)
+        except OSError as e:
+            _download_failed.set()
+            logger.warning("Could not download font %s (%s), using the default font", FONTS[name][0], e)
+    if path is None:
+        return FontProperties(**FALLBACK_FONTS[name])
+    return FontProperties(fname=path)
+
+
+def main(argv=None):
+    # python -m ringo.fonts [--dir DIR]: download every font, into the cache by default
+    argv = sys.argv[1:] if argv is None else argv
+    font_dir = argv[argv.index("--dir") + 1] if "--dir" in argv else FONT_CACHE_DIR
+    for name in FONTS:
+        print(download_font(name, font_dir))
+
+
+if __name__ == "__main__":
+    main()
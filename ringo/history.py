@@ -0,0 +1,185 @@
+# Ringo Radar - several dated databases side by side - code by ringokakiage #
+#
+#   history = DatabaseHistory.discover(".")          # database_jan25.csv, database_jul25.csv, ...
+#   history.windows                                   # ["jan25", "jul25"]
+#   history.player_history(346129, "CB", "league")    # one row of percentiles per window
+#
+# Windows are loaded the first time they are used and dropped, least recently used first,
+# when the loaded ones go over the memory budget. Text columns of every window are encoded
+# against the same string dictionaries, so a team, league or player name seen in several
+# windows is stored once. The window of the database the app runs on can come from the
+# app's engine (load_live): only its names are encoded again, its numbers are not copied.
+import glob
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from ringo.data import CATEGORY_COLUMNS, DATABASE_PATH, ID_COLUMN, METRIC_COLUMNS, read_database
+from ringo.engine import SCOPE_ALL, RadarEngine
+from ringo.export import raw_position_for
+from ringo.plot import DEFAULT_MIN_MINUTES, RadarError
+
+# Loaded windows are dropped above this many bytes (RINGO_HISTORY_MEMORY_MB overrides it)
+HISTORY_MEMORY_BUDGET = int(os.environ.get("RINGO_HISTORY_MEMORY_MB", "512")) * 1024 * 1024
+
+SHARED_STRING_COLUMNS = ["Player"] + CATEGORY_COLUMNS
+
+# Month abbreviations of the file names, in English and Portuguese
+MONTHS = {
+    "jan": 1, "feb": 2, "fev": 2, "mar": 3, "apr": 4, "abr": 4, "may": 5, "mai": 5, "jun": 6, "jul": 7,
+    "aug": 8, "ago": 8, "sep": 9, "set": 9, "oct": 10, "out": 10, "nov": 11, "dec": 12, "dez": 12,
+}
+
+
+def window_label(path):
+    # database_jan25.csv -> jan25
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem[len("database_"):] if stem.startswith("database_") else stem
+
+
+def window_date(label):
+    # jan25 -> (2025, 1), labels that are not a month and a year sort last by name
+    match = re.fullmatch(r"([a-z]{3})(\d{2}|\d{4})", label.lower())
+    if match is None or match.group(1) not in MONTHS:
+        return (9999, 99, label)
+    year = int(match.group(2))
+    return (year + 2000 if year < 100 else year, MONTHS[match.group(1)], label)
+
+
+class SharedStrings:
+    # Append-only dictionary of the strings of one column across every window. Codes never
+    # change, categories of every window point to the same str objects.
+    def __init__(self):
+        self.strings = []
+        self._codes = {}
+
+    def categorical(self, values):
+        inverse, uniques = pd.factorize(pd.Series(values), use_na_sentinel=True)
+        mapping = np.array([self._code(str(value)) for value in uniques] + [-1], dtype=np.int32)
+        # The -1 of missing values picks the -1 at the end of mapping
+        codes = mapping[inverse]
+        codes.flags.writeable = False
+        return pd.Categorical.from_codes(codes, categories=pd.Index(self.strings, dtype=object))
+
+    def _code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def memory_bytes(self):
+        return sum(sys.getsizeof(value) for value in self.strings)
+
+
+def frame_memory_bytes(df):
+    # Text is counted in the shared dictionaries, not here
+    return int(df.memory_usage(index=True, deep=False).sum())
+
+
+class DatabaseHistory:
+    def __init__(self, paths, memory_budget=HISTORY_MEMORY_BUDGET, load_live=None):
+        # load_live() returns the frame of DATABASE_PATH the app already loaded, called when
+        # that window is first used. Without it the window is read from its file like the others.
+        labels = {window_label(path): path for path in paths}
+        self.paths = {label: labels[label] for label in sorted(labels, key=window_date)}
+        self.memory_budget = memory_budget
+        self.load_live = load_live
+        self.strings = {col: SharedStrings() for col in SHARED_STRING_COLUMNS}
+        self._engines = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def discover(cls, directory=".", memory_budget=HISTORY_MEMORY_BUDGET, load_live=None):
+        # Every database_*.csv of the directory, and the snapshots whose CSV is gone
+        paths = set(glob.glob(os.path.join(directory, "database_*.csv")))
+        for snapshot_dir in glob.glob(os.path.join(directory, "database_*.snapshot")):
+            paths.add(os.path.splitext(snapshot_dir)[0] + ".csv")
+        return cls(sorted(paths), memory_budget, load_live)
+
+    @property
+    def windows(self):
+        return list(self.paths)
+
+    def _is_live(self, label):
+        # The window is the database the app runs on, and the app gives its frame
+        return self.load_live is not None and os.path.abspath(self.paths[label]) == os.path.abspath(DATABASE_PATH)
+
+    def _read_window(self, label):
+        # The live window is not read a second time, its numeric columns stay the app's
+        df = self.load_live() if self._is_live(label) else read_database(self.paths[label])
+        columns = {col: self.strings[col].categorical(df[col]) for col in SHARED_STRING_COLUMNS if col in df}
+        return df.assign(**columns)
+
+    def _window_bytes(self, label, engine, pools=()):
+        # The live frame stays loaded whatever the history drops, only its name codes and pools count
+        frame = engine.df[[col for col in SHARED_STRING_COLUMNS if col in engine.df]] if self._is_live(label) \
+            else engine.df
+        return frame_memory_bytes(frame) + sum(frame_memory_bytes(pool) for pool in pools)
+
+    def engine(self, label):
+        # RadarEngine of one window, loaded when needed
+        if label not in self.paths:
+            raise KeyError(f"Unknown window: {label}")
+        with self._lock:
+            engine = self._engines.get(label)
+            if engine is not None:
+                self._engines.move_to_end(label)
+                return engine
+            engine = RadarEngine(self.paths[label], df=self._read_window(label))
+            self._engines[label] = engine
+            self._sizes[label] = self._window_bytes(label, engine)
+            self._evict(keep=label)
+            return engine
+
+    def _evict(self, keep):
+        # Least recently used first, the window in use is always kept
+        for label in [label for label in self._engines if label != keep]:
+            if self.memory_bytes() <= self.memory_budget:
+                break
+            del self._engines[label]
+            del self._sizes[label]
+
+    def loaded_windows(self):
+        return list(self._engines)
+
+    def memory_bytes(self):
+        return sum(self._sizes.values()) + sum(strings.memory_bytes() for strings in self.strings.values())
+
+    def player_history(self, wyscout_id, position_key, scope=SCOPE_ALL, min_minutes=DEFAULT_MIN_MINUTES,
+                       windows=None):
+        # Percentiles of the player in every window where they are in the position pool, oldest
+        # first. A player with several teams in a window gets one row per team.
+        rows = []
+        for label in windows or self.windows:
+            engine = self.engine(label)
+            pool = engine.position_dfs(min_minutes)[position_key]
+            for _, row in pool[pool[ID_COLUMN] == wyscout_id].iterrows():
+                position = raw_position_for(row["Position"], position_key)
+                player_info = (row["League"], row["Team within selected timeframe"], row["Player"], position,
+                               wyscout_id)
+                try:
+                    percentiles = engine.percentiles(player_info, scope, min_minutes)
+                except RadarError:
+                    continue
+                rows.append({
+                    "Window": label,
+                    "Team within selected timeframe": row["Team within selected timeframe"],
+                    "League": row["League"],
+                    "Minutes played": int(row["Minutes played"]),
+                    **{metric: percentiles.get(metric) for metric in METRIC_COLUMNS},
+                })
+            with self._lock:
+                if label in self._sizes:
+                    # The pools of the window are built by now, they count too
+                    self._sizes[label] = self._window_bytes(label, engine,
+                                                            engine.minutes_index().position_dfs.values())
+                    self._evict(keep=label)
+        return pd.DataFrame(rows, columns=["Window", "Team within selected timeframe", "League", "Minutes played"]
+                            + METRIC_COLUMNS)
@@ -0,0 +1,175 @@
+# Ringo Radar - incremental ingestion of new Wyscout exports - code by ringokakiage #
+#
+#   python -m ringo.ingest wyscout_mar25.csv --database database_jan25.csv
+#
+# Rows of the export are upserted into the database, keyed on Wyscout id, team, league and
+# position: matching rows are replaced in place (same row id), new rows are appended and
+# rows missing from the export are kept. Every ingestion appends a version record to
+# database_jan25.versions.jsonl with the position pools it changed, so the percentile matrix
+# and running engines only recompute those pools. Snapshot, matrix and league shards are
+# rewritten when they exist.
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from ringo.data import CSV_FLOAT_PRECISION, DATABASE_PATH, build_snapshot, database_hash, load_database
+from ringo.matrix import PercentileMatrix, percentile_matrix_path
+from ringo.positions import DEDUP_COLUMNS, POSITION_BITS, POSITION_KEYS, position_mask
+from ringo.snapshot import file_sha256, snapshot_path
+
+KEY_COLUMNS = DEDUP_COLUMNS
+
+
+def versions_path(csv_path):
+    # database_jan25.csv -> database_jan25.versions.jsonl
+    return os.path.splitext(csv_path)[0] + ".versions.jsonl"
+
+
+def read_versions(csv_path):
+    path = versions_path(csv_path)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def changed_positions_since(csv_path, dataset_hash):
+    # Position keys changed by the ingestions made after dataset_hash, None when that
+    # version is unknown (the file was replaced by hand) and everything must be rebuilt
+    versions = read_versions(csv_path)
+    hashes = [version["dataset_sha256"] for version in versions]
+    if dataset_hash not in hashes and not (versions and versions[0]["previous_sha256"] == dataset_hash):
+        return None
+    start = hashes.index(dataset_hash) + 1 if dataset_hash in hashes else 0
+    return sorted({key for version in versions[start:] for key in version["positions"]}, key=POSITION_KEYS.index)
+
+
+def read_export(path):
+    # Wyscout exports may or may not carry the unnamed index column of the database
+    df = pd.read_csv(path, float_precision=CSV_FLOAT_PRECISION)
+    return df.drop(columns=[col for col in df.columns if col.startswith("Unnamed:")])
+
+
+def _rows_differ(old, new):
+    # True where any column differs, missing values compare equal
+    differ = np.zeros(len(old), dtype=bool)
+    for col in old.columns:
+        a, b = old[col], new[col]
+        if pd.api.types.is_numeric_dtype(a.dtype) and pd.api.types.is_numeric_dtype(b.dtype):
+            a, b = a.to_numpy(dtype=float), b.to_numpy(dtype=float)
+            differ |= ~((a == b) | (np.isnan(a) & np.isnan(b)))
+        else:
+            a, b = a.astype(str).to_numpy(), b.astype(str).to_numpy()
+            differ |= (a != b) & ~(old[col].isna().to_numpy() & new[col].isna().to_numpy())
+    return differ
+
+
+def merge_export(base, export):
+    # (merged frame, row ids inserted, row ids updated, changed position keys)
+    missing = [col for col in base.columns if col not in export.columns]
+    if missing:
+        raise ValueError(f"Export is missing columns: {missing}")
+    export = export[list(base.columns)].drop_duplicates(KEY_COLUMNS, keep="last")
+
+    base_keys = pd.MultiIndex.from_frame(base[KEY_COLUMNS].astype(str))
+    export_keys = pd.MultiIndex.from_frame(export[KEY_COLUMNS].astype(str))
+    positions = base_keys.get_indexer(export_keys)
+    matched = positions >= 0
+
+    old_rows = base.iloc[positions[matched]]
+    new_rows = export[matched].set_axis(old_rows.index)
+    differ = _rows_differ(old_rows, new_rows)
+    updated = old_rows.index[differ]
+
+    start = int(base.index.max()) + 1 if len(base) else 0
+    inserted_rows = export[~matched]
+    inserted_rows = inserted_rows.set_axis(pd.RangeIndex(start, start + len(inserted_rows)))
+
+    merged = pd.concat([base.drop(index=updated), new_rows.loc[updated], inserted_rows]).sort_index()
+
+    # A pool changes when a changed row is in it, before or after the update
+    mask = np.bitwise_or.reduce(np.concatenate(
+        [position_mask(rows) for rows in (old_rows.loc[updated], new_rows.loc[updated], inserted_rows)]
+    ))
+    changed = [key for key in POSITION_KEYS if mask & POSITION_BITS[key]]
+    return merged, list(inserted_rows.index), list(updated), changed
+
+
+def _write_csv(df, path):
+    tmp_path = path + ".tmp"
+    df.to_csv(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def ingest(export_path, database_path=DATABASE_PATH):
+    # Merges the export into the database and brings the derived files up to date.
+    # Returns the version record, or None when the export changes nothing.
+    # Rewritten whole: rows the export does not touch must come back byte for byte
+    base = pd.read_csv(database_path, index_col=0, float_precision=CSV_FLOAT_PRECISION)
+    previous_sha256 = file_sha256(database_path)
+    merged, inserted, updated, changed = merge_export(base, read_export(export_path))
+    if not inserted and not updated:
+        return None
+
+    _write_csv(merged, database_path)
+    load_database.cache_clear()
+    database_hash.cache_clear()
+    dataset_sha256 = database_hash(database_path)
+
+    versions = read_versions(database_path)
+    version = {
+        "version": versions[-1]["version"] + 1 if versions else 1,
+        "ingested_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "source": os.path.basename(export_path),
+        "source_sha256": file_sha256(export_path),
+        "previous_sha256": previous_sha256,
+        "dataset_sha256": dataset_sha256,
+        "inserted": len(inserted),
+        "updated": len(updated),
+        "positions": changed,
+    }
+
+    # Derived files are only refreshed when they exist, they stay opt-in build steps
+    if os.path.isdir(snapshot_path(database_path)):
+        build_snapshot(database_path)
+    matrix_path = percentile_matrix_path(database_path)
+    if os.path.exists(matrix_path):
+        matrix = PercentileMatrix.load(matrix_path)
+        df = load_database(database_path)
+        if matrix.dataset_hash == previous_sha256:
+            matrix = matrix.update(df, changed, dataset_sha256)
+        else:
+            matrix = PercentileMatrix.build(df, matrix.thresholds, matrix.metrics, dataset_hash=dataset_sha256)
+        matrix.save(matrix_path)
+    # Imported here, ringo.shards builds on the engine, which imports this module
+    from ringo.shards import is_sharded, shards_path, write_shards
+    if is_sharded(shards_path(database_path)):
+        write_shards(database_path)
+
+    # The version record goes last, it vouches for every file above
+    with open(versions_path(database_path), "a", encoding="utf-8") as f:
+        f.write(json.dumps(version, ensure_ascii=False) + "\n")
+    return version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ringo.ingest",
+                                     description="Merge a new Wyscout export into the database.")
+    parser.add_argument("export", help="CSV export with the same columns as the database")
+    parser.add_argument("--database", default=DATABASE_PATH)
+    args = parser.parse_args(argv)
+
+    version = ingest(args.export, args.database)
+    if version is None:
+        print(f"{args.export}: nothing new for {args.database}")
+        return
+    print(f"{args.database} version {version['version']}: {version['inserted']} inserted, "
+          f"{version['updated']} updated, positions {', '.join(version['positions']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# Ringo Radar - league, team and player lookup - code by ringokakiage #
+#
+#   lookup = PlayerLookup(df, position_dfs)
+#   lookup.leagues()                                      # sidebar options, already sorted
+#   lookup.teams("ARG Copa de la Liga")
+#   lookup.players("ARG Copa de la Liga", "Boca Juniors")
+#   lookup.positions("ARG Copa de la Liga", "Boca Juniors", "K. Zenón")   # ["LAMF", "LW", ...]
+#   lookup.player_ids("ARG Copa de la Liga", "Deportivo Riestra", "G. Fernández")  # [73240, 290751]
+#   lookup.pool_row("WIN", ("ARG Copa de la Liga", "Boca Juniors", "K. Zenón", "LW"), min_minutes=500)
+#
+# Built once per dataset with one pass over the database and one per position pool, every
+# query after that is a dictionary lookup. A player is a (league, team, player, Wyscout id)
+# entry: the same name in another team or league is another entry, and so is a teammate
+# with the same name. player_info can end with the Wyscout id, (league, team, player,
+# position, wyscout_id), to pick one of those teammates; without it the name stands for
+# the first of them in database order.
+import numpy as np
+
+NAME_COLUMNS = ["League", "Team within selected timeframe", "Player", "Wyscout id"]
+
+
+def player_id(player_info):
+    # Wyscout id of the player_info, None when it only names the player
+    return player_info[4] if len(player_info) > 4 else None
+
+
+def _name_keys(df):
+    # (league, team, player, wyscout id) of every row, plain Python values
+    return zip(*(df[column].to_numpy(dtype=object) for column in NAME_COLUMNS))
+
+
+class PlayerLookup:
+    # position_dfs are the pools without minutes threshold (create_position_dfs(df, 0)), in
+    # the same row order as MinutesPercentileIndex keeps them
+    def __init__(self, df, position_dfs):
+        self.df = df
+        self.position_dfs = position_dfs
+        rows = {}
+        for row, key in enumerate(_name_keys(df)):
+            rows.setdefault(key, []).append(row)
+        self._tree = {}
+        self._ids = {}
+        self._rows = {}
+        self._positions = {}
+        positions = df["Position"].to_numpy(dtype=object)
+        for key in rows:
+            # Ids of a name in database order, the first one is the name's default
+            self._ids.setdefault(key[:3], []).append(int(key[3]))
+        for league, team, player in sorted(self._ids):
+            self._tree.setdefault(league, {}).setdefault(team, []).append(player)
+        for key, player_rows in rows.items():
+            key = key[:3] + (int(key[3]),)
+            self._rows[key] = df.index[player_rows]
+            # Every position of every row, a player can have several Position strings
+            self._positions[key] = sorted({
+                position.strip() for value in positions[player_rows] if isinstance(value, str)
+                for position in value.split(",")
+            })
+        self._leagues = list(self._tree)
+
+        # (position key, league, team, player, wyscout id) -> (row positions in the pool, minutes played of those rows)
+        self._pool_rows = {}
+        for position_key, pool in position_dfs.items():
+            pool_rows = {}
+            for row, key in enumerate(_name_keys(pool)):
+                pool_rows.setdefault(key, []).append(row)
+            minutes = pool["Minutes played"].to_numpy(dtype=float)
+            for (league, team, player, wyscout_id), player_rows in pool_rows.items():
+                player_rows = np.array(player_rows)
+                key = (position_key, league, team, player, int(wyscout_id))
+                self._pool_rows[key] = (player_rows, minutes[player_rows])
+
+    def __len__(self):
+        # (league, team, player, wyscout id) entries
+        return len(self._rows)
+
+    def _key(self, league, team, player, wyscout_id=None):
+        if wyscout_id is None:
+            ids = self._ids.get((league, team, player))
+            wyscout_id = ids[0] if ids else None
+        return league, team, player, wyscout_id
+
+    def leagues(self):
+        return self._leagues
+
+    def teams(self, league):
+        return list(self._tree.get(league, {}))
+
+    def players(self, league, team):
+        # Player names of the team, once even when teammates share a name
+        return self._tree.get(league, {}).get(team, [])
+
+    def player_ids(self, league, team, player):
+        # Wyscout ids of the players of the team with that name, in database order
+        return self._ids.get((league, team, player), [])
+
+    def positions(self, league, team, player, wyscout_id=None):
+        # Raw positions (LCB, RW, ...) of the player, sorted
+        return self._positions.get(self._key(league, team, player, wyscout_id), [])
+
+    def row_ids(self, league, team, player, wyscout_id=None):
+        # Row ids of the player in the database, in database order
+        return self._rows.get(self._key(league, team, player, wyscout_id), self.df.index[:0])
+
+    def player_rows(self, player_info):
+        # Same rows as masking the database on league, team, player and Wyscout id
+        return self.df.loc[self.row_ids(*player_info[:3], player_id(player_info))]
+
+    def pool_position(self, position_key, player_info, min_minutes=0):
+        # Row position of the player in the pool without threshold, the first one with at
+        # least min_minutes (same row the pool of min_minutes would give first). None if
+        # the player is not in that pool.
+        entry = self._pool_rows.get((position_key,) + self._key(*player_info[:3], player_id(player_info)))
+        if entry is None:
+            return None
+        rows, minutes = entry
+        eligible = np.flatnonzero(minutes >= min_minutes)
+        return int(rows[eligible[0]]) if eligible.size else None
+
+    def pool_row(self, position_key, player_info, min_minutes=0):
+        # One row frame of the player in the pool, empty when the player is not in it
+        pool = self.position_dfs.get(position_key)
+        if pool is None:
+            return None
+        position = self.pool_position(position_key, player_info, min_minutes)
+        return pool.iloc[[] if position is None else [position]]
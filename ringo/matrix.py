@@ -0,0 +1,165 @@
+# Ringo Radar - precomputed percentile matrix - code by ringokakiage #
+#
+# Every player's percentile in every metric, for each minutes threshold, both comparison
+# scopes and each position pool. Built offline next to the dataset:
+#
+#   python -m ringo.matrix database_jan25.csv   ->   database_jan25.percentiles.npz
+#
+# Percentiles are stored as uint16 hundredths, the same 2 decimals the radar shows.
+import json
+import os
+import sys
+
+import numpy as np
+
+from ringo.data import DATABASE_PATH, METRIC_COLUMNS, database_hash, load_database
+from ringo.percentiles import INVERTED_METRICS, rank_percentiles
+from ringo.positions import POSITION_KEYS, create_position_dfs
+
+# Minutes thresholds stored by default (the app slider goes from 300 to 800)
+MATRIX_THRESHOLDS = tuple(range(300, 801, 50))
+
+
+def percentile_matrix_path(csv_path):
+    # database_jan25.csv -> database_jan25.percentiles.npz
+    return os.path.splitext(csv_path)[0] + ".percentiles.npz"
+
+
+def pool_percentiles(pool, metrics, same_league=False, kind='rank'):
+    # (players x metrics) percentiles of a whole pool, each player against the pool
+    # or only against the players of their league
+    values = pool[metrics].to_numpy(dtype=float)
+    result = np.empty(values.shape)
+    groups = [np.arange(len(pool))]
+    if same_league:
+        leagues = pool["League"].to_numpy()
+        groups = [np.flatnonzero(leagues == league) for league in dict.fromkeys(leagues.tolist())]
+    for rows in groups:
+        for i, metric in enumerate(metrics):
+            column = values[rows, i]
+            percentiles = rank_percentiles(np.sort(column[~np.isnan(column)]), column, kind)
+            result[rows, i] = 100 - percentiles if metric in INVERTED_METRICS else percentiles
+    return result
+
+
+class PercentileMatrix:
+    def __init__(self, metrics, thresholds, threshold, same_league, position, row_ids, percentiles, dataset_hash=None):
+        self.metrics = list(metrics)
+        self.thresholds = [int(t) for t in thresholds]
+        self.dataset_hash = dataset_hash
+        self.threshold = threshold
+        self.same_league = same_league
+        self.position = position
+        self.row_ids = row_ids
+        self.percentiles = percentiles
+        # (threshold, same_league, position key) -> slice of the arrays, sorted by row id
+        self._groups = {}
+        starts = np.flatnonzero(np.r_[True, (np.diff(threshold) != 0) | (np.diff(same_league) != 0) |
+                                      (np.diff(position) != 0)]) if len(row_ids) else []
+        ends = list(starts[1:]) + [len(row_ids)]
+        for start, end in zip(starts, ends):
+            key = (int(threshold[start]), bool(same_league[start]), POSITION_KEYS[position[start]])
+            self._groups[key] = (start, end)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.threshold, self.same_league, self.position, self.row_ids,
+                                               self.percentiles))
+
+    @classmethod
+    def build(cls, df, thresholds=MATRIX_THRESHOLDS, metrics=METRIC_COLUMNS, kind='rank', dataset_hash=None,
+              positions=POSITION_KEYS):
+        parts = []
+        for threshold in thresholds:
+            position_dfs = create_position_dfs(df, threshold)
+            for same_league in (False, True):
+                for position, position_key in enumerate(POSITION_KEYS):
+                    if position_key not in positions:
+                        continue
+                    pool = position_dfs[position_key].sort_index()
+                    if pool.empty:
+                        continue
+                    n = len(pool)
+                    parts.append((
+                        np.full(n, threshold, dtype=np.int16),
+                        np.full(n, same_league),
+                        np.full(n, position, dtype=np.int8),
+                        pool.index.to_numpy(dtype=np.int64),
+                        np.rint(pool_percentiles(pool, list(metrics), same_league, kind) * 100).astype(np.uint16),
+                    ))
+        if not parts:
+            arrays = (np.empty(0, np.int16), np.empty(0, bool), np.empty(0, np.int8), np.empty(0, np.int64),
+                      np.empty((0, len(metrics)), np.uint16))
+        else:
+            arrays = [np.concatenate(column) for column in zip(*parts)]
+        return cls(metrics, thresholds, *arrays, dataset_hash=dataset_hash)
+
+    def update(self, df, positions, dataset_hash=None):
+        # New matrix where only the given position pools are recomputed from df, the
+        # other pools must be unchanged in df
+        fresh = PercentileMatrix.build(df, self.thresholds, self.metrics, dataset_hash=dataset_hash,
+                                       positions=positions)
+        slices = []
+        for threshold in self.thresholds:
+            for same_league in (False, True):
+                for position_key in POSITION_KEYS:
+                    source = fresh if position_key in positions else self
+                    group = source._groups.get((threshold, same_league, position_key))
+                    if group is not None:
+                        slices.append((source, slice(*group)))
+        arrays = [
+            np.concatenate([getattr(source, name)[rows] for source, rows in slices]) if slices else getattr(fresh, name)
+            for name in ("threshold", "same_league", "position", "row_ids", "percentiles")
+        ]
+        return PercentileMatrix(self.metrics, self.thresholds, *arrays, dataset_hash=dataset_hash)
+
+    def save(self, path):
+        meta = {"metrics": self.metrics, "thresholds": self.thresholds, "dataset_hash": self.dataset_hash}
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, meta=np.array(json.dumps(meta)), threshold=self.threshold, same_league=self.same_league,
+                 position=self.position, row_ids=self.row_ids, percentiles=self.percentiles)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(meta["metrics"], meta["thresholds"], data["threshold"], data["same_league"], data["position"],
+                       data["row_ids"], data["percentiles"], dataset_hash=meta["dataset_hash"])
+
+    def has_threshold(self, min_minutes):
+        return min_minutes in self.thresholds
+
+    def table(self, min_minutes, same_league, position_key):
+        # (row ids, players x metrics percentiles) of a whole pool, None when not stored
+        group = self._groups.get((min_minutes, bool(same_league), position_key))
+        if group is None:
+            return None
+        start, end = group
+        return self.row_ids[start:end], self.percentiles[start:end] / 100.0
+
+    def lookup(self, min_minutes, same_league, position_key, row_id, columns):
+        # Percentiles of one player in the given columns, None when not stored
+        if not all(column in self.metrics for column in columns):
+            return None
+        table = self.table(min_minutes, same_league, position_key)
+        if table is None:
+            return None
+        row_ids, percentiles = table
+        i = np.searchsorted(row_ids, row_id)
+        if i == len(row_ids) or row_ids[i] != row_id:
+            return None
+        return percentiles[i, [self.metrics.index(column) for column in columns]]
+
+
+def main(argv=None):
+    # python -m ringo.matrix [database.csv ...]
+    paths = (argv if argv is not None else sys.argv[1:]) or [DATABASE_PATH]
+    for path in paths:
+        matrix = PercentileMatrix.build(load_database(path), dataset_hash=database_hash(path))
+        print(f"{path} -> {matrix.save(percentile_matrix_path(path))} ({len(matrix.row_ids)} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# Ringo Radar - memory budget - code by ringokakiage #
+#
+# One byte budget for the caches of a long-running process: rendered images, percentile
+# matrices, position pools of each minutes threshold and the trees of the percentile index.
+# Every cache (ringo.cache.SizedCache) keeps its own values, the budget only keeps their
+# sizes in the order they were used. Once the total goes over max_bytes the least recently
+# used entries are evicted, whatever cache they belong to.
+#
+#   RINGO_MEMORY_BUDGET_MB=512 streamlit run ringo_radar.py
+#   engine.memory_usage()   # budget, dataset, process RSS and open figures
+import os
+import threading
+from collections import OrderedDict
+
+MEMORY_BUDGET_BYTES = int(os.environ.get("RINGO_MEMORY_BUDGET_MB", "256")) * 1024 * 1024
+
+
+def frame_bytes(df):
+    # Everything the frame holds, text included
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def resident_bytes():
+    # Current resident memory of the process (Linux), None elsewhere
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class MemoryBudget:
+    def __init__(self, max_bytes=MEMORY_BUDGET_BYTES):
+        self.max_bytes = max_bytes
+        # (cache, key) -> size, least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.evictions = 0
+
+    def charge(self, cache, key, size):
+        # Counts a new entry of cache. Returns the entries to evict to get back under the
+        # budget, the caller hands them to evict() once it released its own lock.
+        victims = []
+        with self._lock:
+            old_size = self._entries.pop((cache, key), None)
+            if old_size is not None:
+                self.size_bytes -= old_size
+            self._entries[cache, key] = size
+            self.size_bytes += size
+            # The new entry stays, SizedCache never charges one larger than the whole budget
+            while self.size_bytes > self.max_bytes and len(self._entries) > 1:
+                victim, victim_size = self._entries.popitem(last=False)
+                self.size_bytes -= victim_size
+                self.evictions += 1
+                victims.append(victim)
+        return victims
+
+    @staticmethod
+    def evict(victims):
+        for cache, key in victims:
+            cache.evicted(key)
+
+    def touch(self, cache, key):
+        with self._lock:
+            if (cache, key) in self._entries:
+                self._entries.move_to_end((cache, key))
+
+    def release(self, cache, key):
+        # The cache dropped the entry itself
+        with self._lock:
+            size = self._entries.pop((cache, key), None)
+            if size is not None:
+                self.size_bytes -= size
+
+    def is_charged(self, cache, key):
+        with self._lock:
+            return (cache, key) in self._entries
+
+    def usage(self):
+        with self._lock:
+            caches = {}
+            for (cache, _), size in self._entries.items():
+                entry = caches.setdefault(cache.name, {"entries": 0, "size_bytes": 0})
+                entry["entries"] += 1
+                entry["size_bytes"] += size
+            return {
+                "max_bytes": self.max_bytes,
+                "size_bytes": self.size_bytes,
+                "evictions": self.evictions,
+                "caches": caches,
+            }
+
+
+# Shared by every engine of the process unless one is given its own
+_default_budget = None
+_default_budget_lock = threading.Lock()
+
+
+def default_budget():
+    global _default_budget
+    with _default_budget_lock:
+        if _default_budget is None:
+            _default_budget = MemoryBudget()
+        return _default_budget
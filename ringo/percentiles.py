@@ -0,0 +1,314 @@
+# Ringo Radar - percentile engine - code by ringokakiage #
+import threading
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from ringo.cache import SizedCache
+from ringo.lookup import player_id
+from ringo.memory import default_budget, frame_bytes
+
+# Metrics where a lower value is better (the percentile is inverted)
+INVERTED_METRICS = ['Fouls per 90', 'Cards per 90']
+
+PERCENTILE_KINDS = ('rank', 'weak', 'strict', 'mean')
+
+
+def rank_percentiles(sorted_values, scores, kind='rank'):
+    # Same result as scipy.stats.percentileofscore, for many scores at once,
+    # against an array that is already sorted
+    if kind not in PERCENTILE_KINDS:
+        raise ValueError(f"kind can only be one of {PERCENTILE_KINDS}, got {kind!r}")
+    scores = np.asarray(scores, dtype=float)
+    left = np.searchsorted(sorted_values, scores, side='left')
+    right = np.searchsorted(sorted_values, scores, side='right')
+    return percentiles_from_counts(left, right, len(sorted_values), scores, kind)
+
+
+def percentiles_from_counts(left, right, n, scores, kind='rank'):
+    # left: values < score, right: values <= score, n: values compared against
+    if n == 0:
+        return np.full(np.shape(scores), np.nan)
+    if kind == 'rank':
+        percentiles = (left + right + (right > left)) * (50.0 / n)
+    elif kind == 'weak':
+        percentiles = right * (100.0 / n)
+    elif kind == 'strict':
+        percentiles = left * (100.0 / n)
+    else:
+        percentiles = (left + right) * (50.0 / n)
+    return np.where(np.isnan(scores), np.nan, percentiles)
+
+
+def player_pool_rows(pool_df, player_info, min_minutes=None):
+    # Rows of the player (league, team, player, position[, wyscout_id]) in a pool, with at
+    # least min_minutes when given
+    league, team, player = player_info[:3]
+    mask = (
+        (pool_df['League'] == league).to_numpy() &
+        (pool_df['Player'] == player).to_numpy() &
+        (pool_df['Team within selected timeframe'] == team).to_numpy()
+    )
+    if player_id(player_info) is not None:
+        mask &= pool_df['Wyscout id'].to_numpy() == player_id(player_info)
+    if min_minutes is not None:
+        mask &= pool_df['Minutes played'].to_numpy() >= min_minutes
+    return pool_df.iloc[np.flatnonzero(mask)]
+
+
+class PercentileEngine:
+    # Keeps a sorted array for every (position key, scope, metric) that was asked for.
+    # scope is None for the whole database or a league name for "same league" comparisons.
+    def __init__(self, position_dfs, kind='rank'):
+        if kind not in PERCENTILE_KINDS:
+            raise ValueError(f"kind can only be one of {PERCENTILE_KINDS}, got {kind!r}")
+        self.position_dfs = position_dfs
+        self.kind = kind
+        self._sorted = {}
+
+    def pool(self, position_key, scope=None):
+        pool_df = self.position_dfs.get(position_key)
+        if pool_df is None:
+            raise KeyError(f"No data available for position: {position_key}")
+        if scope is not None:
+            pool_df = pool_df[pool_df['League'] == scope]
+        return pool_df
+
+    def sorted_values(self, position_key, scope, column):
+        key = (position_key, scope, column)
+        if key not in self._sorted:
+            values = self.pool(position_key, scope)[column].to_numpy(dtype=float)
+            self._sorted[key] = np.sort(values[~np.isnan(values)])
+        return self._sorted[key]
+
+    def percentiles(self, position_key, scope, columns, values):
+        # One percentile per column, values[i] is the player's value in columns[i]
+        values = np.asarray(values, dtype=float)
+        if len(columns) != len(values):
+            raise ValueError(f"Got {len(values)} values for {len(columns)} columns")
+        result = np.empty(len(columns))
+        for i, column in enumerate(columns):
+            result[i] = rank_percentiles(self.sorted_values(position_key, scope, column), values[i], self.kind)
+            if column in INVERTED_METRICS:
+                result[i] = 100 - result[i]
+        return result
+
+    def pool_size(self, position_key, scope=None):
+        return self.pool(position_key, scope).shape[0]
+
+    def league_count(self, position_key, scope=None):
+        return self.pool(position_key, scope)['League'].nunique()
+
+    def pool_row(self, position_key, player_info):
+        return player_pool_rows(self.pool(position_key), player_info)
+
+
+class MergeSortTree:
+    # Counts, for any prefix [0, p) of an array, how many values are < x or <= x,
+    # in O(log² n). Level L holds the array cut in sorted blocks of 2**L values, a
+    # prefix is split in at most one block per level. NaN values are never counted.
+    def __init__(self, values):
+        values = np.asarray(values, dtype=float)
+        size = 1
+        while size < len(values):
+            size *= 2
+        padded = np.full(size, np.inf)
+        padded[:len(values)] = np.where(np.isnan(values), np.inf, values)
+        self.levels = [padded]
+        block = 1
+        while block < size:
+            block *= 2
+            self.levels.append(np.sort(padded.reshape(-1, block), axis=1).ravel())
+        # valid[p]: values that are not NaN in [0, p)
+        self.valid = np.concatenate([[0], np.cumsum(~np.isnan(values))])
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self.levels) + self.valid.nbytes
+
+    def count(self, p, x, side='right'):
+        total = 0
+        start = 0
+        for level in reversed(range(len(self.levels))):
+            block = 1 << level
+            if p & block:
+                total += np.searchsorted(self.levels[level][start:start + block], x, side=side)
+                start += block
+        return total
+
+    def counts(self, p, x):
+        # (count(p, x, 'left'), count(p, x, 'right')) in one pass: the values <= x are the
+        # values < the next float after x
+        scores = np.array([x, np.nextafter(x, np.inf)])
+        total = np.zeros(2, dtype=np.int64)
+        start = 0
+        for level in reversed(range(len(self.levels))):
+            block = 1 << level
+            if p & block:
+                total += np.searchsorted(self.levels[level][start:start + block], scores)
+                start += block
+        return total[0], total[1]
+
+
+class MinutesPercentileIndex:
+    # Percentiles for any minimum of minutes without rebuilding the pools. Every pool is
+    # built once without threshold and ordered by minutes played, most minutes first, so
+    # "players with minutes >= m" is always a prefix of that order. A merge-sort tree per
+    # (position key, scope, metric) then counts the players of that prefix below a value.
+    # Pool sizes and league counts are read from the prefix, no pool is built for them.
+    # Trees and the pools of each threshold are cached within the memory budget, the one of
+    # the process unless budget is given.
+    def __init__(self, position_dfs, kind='rank', budget=None):
+        if kind not in PERCENTILE_KINDS:
+            raise ValueError(f"kind can only be one of {PERCENTILE_KINDS}, got {kind!r}")
+        self.position_dfs = position_dfs
+        self.kind = kind
+        self.budget = default_budget() if budget is None else budget
+        self._orders = {}
+        self._league_starts = {}
+        self._trees = SizedCache(budget=self.budget, name="percentile_trees", sizeof=lambda tree: tree.nbytes)
+        self._pools = SizedCache(budget=self.budget, name="position_pools", sizeof=frame_bytes)
+        self._lock = threading.Lock()
+
+    def _order(self, position_key, scope=None):
+        # Row positions of the pool (or of its league) by minutes played, and the negated minutes
+        key = (position_key, scope)
+        with self._lock:
+            if key in self._orders:
+                return self._orders[key]
+            pool_df = self.position_dfs.get(position_key)
+            if pool_df is None:
+                raise KeyError(f"No data available for position: {position_key}")
+            rows = np.arange(pool_df.shape[0])
+            if scope is not None:
+                rows = rows[(pool_df['League'] == scope).to_numpy()]
+            minutes = -pool_df["Minutes played"].to_numpy(dtype=float)[rows]
+            order = np.argsort(minutes, kind='stable')
+            self._orders[key] = (rows[order], minutes[order])
+            return self._orders[key]
+
+    def prefix_size(self, position_key, scope, min_minutes):
+        # Players of the pool with at least min_minutes
+        minutes = self._order(position_key, scope)[1]
+        return int(np.searchsorted(minutes, -min_minutes, side='right'))
+
+    def league_count(self, position_key, scope, min_minutes):
+        # Leagues of the players with at least min_minutes
+        p = self.prefix_size(position_key, scope, min_minutes)
+        if scope is not None:
+            return int(p > 0)
+        with self._lock:
+            starts = self._league_starts.get(position_key)
+        if starts is None:
+            # Prefix length at which each league shows up first, sorted
+            rows = self._order(position_key)[0]
+            codes = pd.factorize(self.position_dfs[position_key]['League'])[0][rows]
+            starts = np.sort(np.unique(codes, return_index=True)[1])
+            with self._lock:
+                self._league_starts[position_key] = starts
+        return int(np.searchsorted(starts, p, side='left'))
+
+    def pool(self, position_key, min_minutes=0, scope=None):
+        # Same rows and row order as create_position_dfs(df, min_minutes) would give,
+        # cached for each threshold
+        def build():
+            rows, minutes = self._order(position_key, scope)
+            p = int(np.searchsorted(minutes, -min_minutes, side='right'))
+            return self.position_dfs[position_key].iloc[np.sort(rows[:p])]
+
+        return self._pools.get_or_render((position_key, min_minutes, scope), build)
+
+    def tree(self, position_key, scope, column):
+        key = (position_key, scope, column)
+        rows = self._order(position_key, scope)[0]
+
+        def build():
+            values = self.position_dfs[position_key][column].to_numpy(dtype=float)[rows]
+            return MergeSortTree(values)
+
+        with self._lock:
+            return self._trees.get_or_render(key, build)
+
+    def percentiles(self, position_key, scope, columns, values, min_minutes=0):
+        values = np.asarray(values, dtype=float)
+        if len(columns) != len(values):
+            raise ValueError(f"Got {len(values)} values for {len(columns)} columns")
+        p = self.prefix_size(position_key, scope, min_minutes)
+        result = np.empty(len(columns))
+        for i, column in enumerate(columns):
+            tree = self.tree(position_key, scope, column)
+            left, right = tree.counts(p, values[i])
+            result[i] = percentiles_from_counts(left, right, tree.valid[p], values[i], self.kind)
+            if column in INVERTED_METRICS:
+                result[i] = 100 - result[i]
+        return result
+
+    def at(self, min_minutes):
+        return MinutesPercentileView(self, min_minutes)
+
+    def update(self, position_dfs, changed):
+        # New index where only the changed pools are taken from position_dfs, the other
+        # pools keep their sorted orders and trees
+        pools = {
+            key: pool if key in changed or key not in self.position_dfs else self.position_dfs[key]
+            for key, pool in position_dfs.items()
+        }
+        index = MinutesPercentileIndex(pools, self.kind, self.budget)
+        with self._lock:
+            index._orders = {key: value for key, value in self._orders.items() if key[0] not in changed}
+            index._league_starts = {key: value for key, value in self._league_starts.items() if key not in changed}
+        # Moved to the new index, so the budget does not count them twice
+        for old_cache, new_cache in ((self._trees, index._trees), (self._pools, index._pools)):
+            for key, value in old_cache.items():
+                if key[0] not in changed:
+                    new_cache.put(key, value)
+            old_cache.clear()
+        return index
+
+
+class _ThresholdPools(Mapping):
+    # position_dfs of a view, each pool is only built when asked for
+    def __init__(self, index, min_minutes):
+        self.index = index
+        self.min_minutes = min_minutes
+
+    def __getitem__(self, position_key):
+        if position_key not in self.index.position_dfs:
+            raise KeyError(position_key)
+        return self.index.pool(position_key, self.min_minutes)
+
+    def __contains__(self, position_key):
+        # Without building the pool
+        return position_key in self.index.position_dfs
+
+    def __iter__(self):
+        return iter(self.index.position_dfs)
+
+    def __len__(self):
+        return len(self.index.position_dfs)
+
+
+class MinutesPercentileView:
+    # Same interface as PercentileEngine for one minimum of minutes
+    def __init__(self, index, min_minutes):
+        self.index = index
+        self.min_minutes = min_minutes
+        self.kind = index.kind
+        self.position_dfs = _ThresholdPools(index, min_minutes)
+
+    def pool(self, position_key, scope=None):
+        return self.index.pool(position_key, self.min_minutes, scope)
+
+    def percentiles(self, position_key, scope, columns, values):
+        return self.index.percentiles(position_key, scope, columns, values, self.min_minutes)
+
+    def pool_size(self, position_key, scope=None):
+        return self.index.prefix_size(position_key, scope, self.min_minutes)
+
+    def league_count(self, position_key, scope=None):
+        return self.index.league_count(position_key, scope, self.min_minutes)
+
+    def pool_row(self, position_key, player_info):
+        # Found in the pool without threshold, the pool of this threshold is not built
+        return player_pool_rows(self.index.position_dfs[position_key], player_info, self.min_minutes)
@@ -0,0 +1,418 @@
+# Ringo Radar - pizza plot - code by ringokakiage #
+from contextlib import contextmanager
+
+import matplotlib.pyplot as plt
+import numpy as np
+from mplsoccer import PyPizza
+
+from ringo.fonts import get_font
+from ringo.percentiles import PercentileEngine
+from ringo.positions import position_map
+from ringo.timing import stage
+
+# Minimum minutes used when none is given (same default as the app slider)
+DEFAULT_MIN_MINUTES = 500
+
+# Slice colors by percentile: (upper bound, color, legend label)
+SLICE_COLOR_BANDS = [
+    (30, '#a20e0e', "Very below average (0-30%)"),
+    (45, '#d8580b', "Below average (30-45%)"),
+    (65, '#f6d354', "Average (45-65%)"),
+    (80, '#329999', "Above average (65-80%)"),
+    (95, '#396892', "Excellent (80-90%)"),
+    (100, '#814a66', "Top 5% (95%+)"),
+]
+
+
+class RadarError(Exception):
+    # The radar can't be drawn for the given selection, the message says why
+    pass
+
+
+positions_gk = ['GK']
+
+# Defenders
+positions_cb = ['CB', 'RCB', 'LCB', 'RCB3', 'LCB3']
+positions_lb = ['LB','LWB', 'LB5',]
+positions_rb = ['RB','RWB', 'RB5',]
+
+
+# Midfielders
+positions_dmf = ['DMF', 'LDMF', 'RDMF',]
+positions_cmf = ['RCMF', 'LCMF', 'LCMF3', 'RCMF3', 'CMF',]
+positions_amf = ['AMF', 'LAMF', 'RAMF']
+
+# Forwards
+positions_cf = ['CF']
+positions_win = ['WIN', 'LW', 'RW', 'LWF', 'RWF']
+
+
+# Define the pizza variables
+pizza_var_names_dict = {
+    # general stats, simple, 16 (4 of each category)
+    'metrics': [
+        'wSwC', 'wAwC', 'wDcwC', 'Aerial impact', 'wDpwC','wPwC'
+    ],
+
+    'swc': ['Goal conversion, %', 'Shots on target per 90', 'Shots on target, %', 'SoT pTt',
+                    'Touches in box per 90', 'SoT/RB', 'Goal pTt',
+           ],
+    
+    
+    'gen': [
+        'Non-penalty goals per 90', 'npxG per 90', 'npxG per shot',
+        'Shots per 90', 'Goal conversion, %',
+        
+        'xA per 90', '1st, 2nd, 3rd assists', 'Shot assists per 90', 
+        'Crosses per 90', 'Accurate crosses, %', 
+        'Accurate passes, %','Accurate long passes, %',
+        
+        'Successful dribbles per 90', 'Offensive duels won, %', 
+        'Progressive passes per 90', 'Progressive runs per 90', 
+
+        'Aerial duels per 90','Aerial duels won, %', 
+        'Shots blocked per 90', 'Defensive duels won, %', 'PAdj Interceptions', 'PAdj Sliding tackles'
+    ],
+
+    'att': [
+        'Non-penalty goals per 90', 'npxG per 90', 'Shots per 90', 'Shots on target per 90', 
+        'Goal conversion, %', 'npxG per shot',
+        # 'xA per 90', 'xA per 90 Ctb %','1st, 2nd, 3rd assists', 'Shot assists per 90',
+        'Offensive duels won per 90', 'Offensive duels won, %', 'Offensive duels per 90 Ctb %',
+        'Accelerations per 90', 'Progressive runs per 90', 'Touches in box per 90', 'Touches in box per 90 Ctb %',
+        'Dribbles per 90', 'Successful dribbles, %', 'Dribbles per 90 Ctb %',
+        'Fouls suffered per 90',
+    ],
+    'pass': [
+        'xA per 90','1st, 2nd, 3rd assists', 'Shot assists per 90',
+        'Crosses per 90','Accurate crosses, %', 'Crosses per 90 Ctb %',
+        'PwC',
+        'Long passes per 90', 'Accurate long passes, %', 
+        'Passes per 90', 'Accurate passes per 90', 
+        'Progressive passes per 90', 'Accurate progressive passes, %',  
+        'Forward passes per 90', 'Accurate forward passes, %','Passes to final third per 90', 'Accurate passes to final third, %', 
+        # 'Accelerations per 90', 'Progressive runs per 90', 'Touches in box per 90', 'Touches in box per 90 Ctb %',
+    ],
+    'def': [
+        'Defensive duels won per 90', 'Defensive duels won, %', 'Aerial duels won, %', 'PAdj Interceptions',
+        'PAdj Sliding tackles', 'Shots blocked per 90', 'Fouls per 90', 'Cards per 90'
+    ]
+}
+
+# Define the pizza variables with spaces (necessary for the pizza plot)
+pizza_var_names_spaced_dict = {
+    'metrics': [
+        'Shooting', 'Attacking', 'Positional\ndefense','Aerial impact', 'Reactive\ndefense', 'Passing',
+    ],
+
+     'swc': ['Goal conversion, %', 'Shots on target\n per 90', 'Shots\n on target, %', 'SoT pTt',
+                    'Touches in box\n per 90', 'SoT/RB', 'Goal pTt',
+           ],
+    
+    
+     'gen': [
+        'npGoals\n(90)', 'npxG\n(90)', 'npxG/shot',
+        'Shots\n(90)', 'Goal/SoT\n success (%)',
+        
+        'xA\n(90)', '1st, 2nd, 3rd\n assist (90)', 'Shot\nassist (90)', 
+        'Crosses\n(90)', 'Cross\nacc. (%)', 
+        'Pass\nacc. (%)', 'Long pass\nacc. (%)', 
+        
+        'Success\ndribble (90)', 'Off. duel\nwon (%)', 
+        'Prog.\npasses (90)', 'Prog.\nruns (90)', 
+
+        'Aerial\nduels (90)', 'Aerial\nwins (%)',
+        'Shot\nblocks (90)', 'Def. duels\nwon (%)', 'PAdj\nInt (90)', 'PAdj\ntackles (90)'
+    ],
+
+    # 'gen': [
+    #     'npG\n (90)', 'npxG\n(90)',
+    #     'Shots (90)', 'AwC',
+    #     '1st, 2nd, 3rd\n assists (90)', 'xA (90)', 'PwC', 'Crosses\n (90)', 
+    #     'Offensive duels\n won (%)', 'Successful\n dribbles (90)', 
+    #     'Prog.\n passes (90)', 'Prog.\n runs (90)', 'DwC',
+    #     'Aerial\n duels won (%)','Shots', 'Def. duels\n won (%)', 'PAdj\n Interceptions (90)', 'PAdj\n Tackles (90)'
+    
+    # ],
+    'att': [
+        'npG\n (90)', 'npxG\n (90)', 'Shots (90)', 'SoT (90)', 
+        'G/s\n conversion, %', 'npxG/\nshot',
+        # 'xA per 90','xA per 90\n Ctb %','1st, 2nd, 3rd\n assists', 'Shot assists\n per 90',
+        'Off. duels\n won (90)','Off. duels\n won (%)', 'Off. duels\n player/team (%)',
+        'Accelerations','Prog.\n runs (90)','Touches in\n box per 90','Touches in\n box per 90 Ctb %',
+        'Dribbles\n (90)','Successful\n dribbles (%)','Dribbles\n per 90 Ctb %','Fouls\n suffered (90)',
+    ],
+    
+
+    'pass': [
+        'xA\n(90)','1st, 2nd, 3rd\n assists (90)', 'Shot\n assists (90)',
+        'Crosses per 90', 'Accurate\n crosses, %', 'Crosses\n (indCtb %',
+        'PwC',
+        'Long\n passes per 90', 'Accurate\n long passes, %', 
+        'Passes per 90', 'Accurate\n passes, %', 
+        'Progressive\n passes per 90', 'Accurate\n progressive passes, %', 
+        'Forward\n passes per 90', 'Accurate\n forward passes, %','Passes to\n final third per 90', 'Accurate passes\n to final third, %', 
+        # 'Accelerations per 90', 'Progressive runs per 90', 'Touches in box per 90', 'Touches in box per 90 Ctb %',
+    ],
+    
+    'def': [
+        'Defensive duels\n won per 90', 'Defensive duels\n won, %', 'Aerial duels won, %',
+        'PAdj\n Interceptions','PAdj\n Sliding tackles', 'Shots blocked\n per 90',
+        'Fouls per 90','Cards per 90',
+    ]
+}
+
+
+def map_primary_position(player_position):
+    if not player_position:
+        return None
+    if isinstance(player_position, str):
+        positions = player_position.split(", ")
+        mapped_positions = [position_map.get(pos.strip(), None) for pos in positions]
+        valid_positions = [pos for pos in mapped_positions if pos]
+        return valid_positions[0] if valid_positions else None
+    return None
+
+def compute_pizza_values(player_info, position_dfs, plot_type, percentile_engine=None, comparison_league=None,
+                         percentile_matrix=None, min_minutes=DEFAULT_MIN_MINUTES, player_lookup=None):
+    # Everything the pizza plot shows, without drawing it.
+    # comparison_league is None to compare against the whole database. Percentiles are
+    # read from percentile_matrix when it has them, computed otherwise. With a player_lookup
+    # (ringo.lookup) the player's row is found without scanning the pool.
+    if percentile_engine is None:
+        percentile_engine = PercentileEngine(position_dfs)
+
+    # Unpack player info
+    player_league, player_team, player_name, player_position = player_info[:4]
+# Map primary position
+    primary_position = map_primary_position(player_position)
+    if primary_position is None:
+        return None 
+    elif not primary_position:
+        raise RadarError(f"Positions {player_position} are not categorized.")
+    
+    # Determine which dataframe to use
+    position_key = ''
+    if primary_position in positions_gk:
+        position_key = 'GK'
+    elif primary_position in positions_cb + positions_lb + positions_rb:
+        position_key = 'CB' if primary_position in positions_cb else 'LB' if primary_position in positions_lb else 'RB'
+    elif primary_position in positions_dmf + positions_cmf + positions_amf:
+        position_key = 'DMF' if primary_position in positions_dmf else 'CMF' if primary_position in positions_cmf else 'AMF'
+    elif primary_position in positions_win:
+        position_key = 'WIN'
+    elif primary_position in positions_cf:
+        position_key = 'CF'
+    
+    # Check if position_key was determined
+    if not position_key:
+        raise RadarError(f"Primary position {primary_position} not categorized.")
+    
+    # Check the position has a dataframe
+    if position_key not in position_dfs:
+        raise RadarError(f"No data available for position: {primary_position}")
+    
+    # Filter the player's data
+    if player_lookup is not None:
+        jogador_pizza = player_lookup.pool_row(position_key, player_info, min_minutes)
+    else:
+        jogador_pizza = percentile_engine.pool_row(position_key, player_info)
+    
+    if jogador_pizza.empty:
+        raise RadarError(f"No data found for player: {player_name} in team: {player_team} under position: {primary_position}")
+
+    # Number of players the player is compared against, and the leagues they come from
+    num_players = percentile_engine.pool_size(position_key, comparison_league)
+    num_leagues = percentile_engine.league_count(position_key, comparison_league)
+
+    # Select the columns to be used in the pizza plot
+    jogador_pizza_1 = jogador_pizza.select_dtypes(exclude='object').copy()
+    pizza_var_names = pizza_var_names_dict[plot_type]
+    pizza_var_names_spaced = pizza_var_names_spaced_dict[plot_type]
+    jogador_pizza_1_1 = jogador_pizza_1[pizza_var_names]
+    jogador_colunas = jogador_pizza_1_1.columns[0:]
+
+    # Extract values and calculate percentiles
+    valores_colunas = [jogador_pizza_1_1[column].iloc[0] for column in jogador_colunas]
+    percent_jogador = None
+    with stage("percentiles"):
+        if percentile_matrix is not None:
+            percent_jogador = percentile_matrix.lookup(min_minutes, comparison_league is not None, position_key,
+                                                       jogador_pizza.index[0], list(jogador_colunas))
+        if percent_jogador is None:
+            percent_jogador = percentile_engine.percentiles(position_key, comparison_league, list(jogador_colunas), valores_colunas)
+    percent_jogador = np.around(percent_jogador, 2)
+
+    return {
+        'position_key': position_key,
+        'player_row': jogador_pizza.iloc[0],
+        'num_players': num_players,
+        'num_leagues': num_leagues,
+        'columns': list(jogador_colunas),
+        'params': pizza_var_names_spaced,
+        'values': valores_colunas,
+        'percentiles': percent_jogador,
+    }
+
+
+def slice_color(value):
+    return next((color for upper, color, _ in SLICE_COLOR_BANDS if value <= upper), SLICE_COLOR_BANDS[-1][1])
+
+
+def text_color(slice_color):
+    # Dark text on the light yellow slices, white on the others
+    return 'black' if slice_color == '#f6d354' else 'white'
+
+
+def value_texts(pizza_values, value_display="Percentile"):
+    # Text of each value box
+    if value_display == "Index values":
+        return [f"{value:.2f}" for value in pizza_values['values']]
+    return [f"{value:.2f}" for value in pizza_values['percentiles']]
+
+
+def radar_texts(player_info, pizza_values, plot_type, value_display="Percentile", min_minutes=DEFAULT_MIN_MINUTES):
+    # Title, subtitle and credit lines of the radar
+    player_name = player_info[2]
+    player_row = pizza_values['player_row']
+    player_league = player_row['League']
+    player_age = player_row['Age']
+    player_position = player_row['Primary position']
+    player_club = player_row['Team within selected timeframe']
+    player_minutes = player_row['Minutes played']
+    file_suffix = {'att': 'attacking', 'pass': 'passing', 'def': 'defensive', 'gen': 'general', 'metrics': 'Ringo metrics', 'swc': 'swc metrics'}[plot_type]
+    return {
+        'title': f'{player_name}, Age: {player_age}, {player_position}, {player_minutes} minutes, {player_club}',
+        'subtitle': f'League: {player_league}, Percentile rankings: {file_suffix}',
+        'credits': [
+            f"data: wyscout | values in: {value_display}",
+            f"db: {pizza_values['num_players']} {pizza_values['position_key']} with {min_minutes} + min from "
+            f"{pizza_values['num_leagues']} relevant {'league' if pizza_values['num_leagues'] == 1 else 'leagues'}",
+            "reddit: u/ringokakiage | ringokakiage.wordpress.com",
+        ],
+    }
+
+
+def create_pizza_plot(player_info, position_dfs, plot_type, percentile_engine=None, comparison_league=None,
+                      value_display="Percentile", min_minutes=DEFAULT_MIN_MINUTES, percentile_matrix=None,
+                      player_lookup=None):
+    # comparison_league is None to compare against the whole database
+    pizza_values = compute_pizza_values(player_info, position_dfs, plot_type, percentile_engine, comparison_league,
+                                        percentile_matrix, min_minutes, player_lookup)
+    if pizza_values is None:
+        return None
+    with stage("figure"):
+        return draw_pizza_plot(player_info, pizza_values, plot_type, value_display, min_minutes)
+
+
+def draw_pizza_plot(player_info, pizza_values, plot_type, value_display="Percentile", min_minutes=DEFAULT_MIN_MINUTES):
+    # (fig, ax) of the radar for the result of compute_pizza_values. The artists that change
+    # from player to player have a gid, ringo.template redraws only those.
+    pizza_var_names_spaced = pizza_values['params']
+    percent_jogador = pizza_values['percentiles']
+
+    # Determine slice and text colors based on percentage values
+    slice_colors = [slice_color(value) for value in percent_jogador]
+    text_colors = [text_color(color) for color in slice_colors]
+
+    # Fonts are loaded the first time a radar is drawn
+    font_normal, font_italic, font_bold = get_font("normal"), get_font("italic"), get_font("bold")
+
+    # Create the pizza plot
+    baker = PyPizza(
+        params=pizza_var_names_spaced,
+        min_range=None,
+        max_range=None,
+        straight_line_color="#F2F2F2",
+        straight_line_lw=1,
+        last_circle_lw=0,
+        other_circle_lw=1,
+        other_circle_ls="-.",
+        inner_circle_size=20,  # size of inner circle
+    )
+    
+    # Make the pizza plot
+    fig, ax = baker.make_pizza(
+        percent_jogador,
+        figsize=(12, 12),
+        param_location=110,
+        slice_colors=slice_colors,
+        value_colors=text_colors,
+        value_bck_colors=slice_colors,
+        color_blank_space="same",
+        blank_alpha=0.25,
+        kwargs_slices=dict(
+            facecolor="cornflowerblue", edgecolor="#F2F2F2",
+            zorder=2, linewidth=1
+        ),
+        kwargs_params=dict(
+            color="#000000", fontsize=12,
+            fontproperties=font_normal, va="center"
+        ),
+        kwargs_values=dict(
+            color="#000000", fontsize=12,
+            fontproperties=font_normal, zorder=3,
+            bbox=dict(
+                edgecolor="#000000", facecolor="cornflowerblue", lw=1
+            )
+        )
+    )
+
+    # Put the values in the pizza plot
+    texts = baker.get_value_texts()
+    for text, value_text in zip(texts, value_texts(pizza_values, value_display)):
+        text.set_text(value_text)
+        text.set_gid("value")
+
+
+    # Add title and subtitle
+    texts = radar_texts(player_info, pizza_values, plot_type, value_display, min_minutes)
+    fig.text(
+        0.515, 0.97, texts['title'], size=16,
+        ha="center", fontproperties=font_bold, color="#000000", gid="title"
+    )
+    fig.text(
+        0.515, 0.942,
+        texts['subtitle'],
+        size=13,
+        ha="center", fontproperties=font_bold, color="#000000", fontweight='bold', gid="subtitle"
+    )
+
+    # Add the slice colors legend
+    fig.text(
+        0.125, 0.17, "Slice colors:", size=9,
+        fontproperties=font_italic, color="#000000",
+        ha="left"
+    )
+    for i, (_, color, label) in enumerate(SLICE_COLOR_BANDS):
+        fig.text(
+            0.125, 0.155 - 0.015 * i, label, size=9,
+            fontproperties=font_italic, color=color,
+            ha="left"
+        )
+
+    # Add credits
+    fig.text(
+        0.905, 0.08, "\n".join(texts['credits']), size=9,
+        fontproperties=font_italic, color="#000000",
+        ha="right", gid="credits"
+    )
+
+    # Return the figure and axes
+    return fig, ax
+
+
+def close_figure(fig):
+    # pyplot keeps every figure it created until it is closed. Clearing it first also lets
+    # go of the artists right away, even if something still holds the figure.
+    fig.clear()
+    plt.close(fig)
+
+
+@contextmanager
+def closing_figure(fig):
+    # with closing_figure(fig): fig.savefig(...)
+    try:
+        yield fig
+    finally:
+        close_figure(fig)
@@ -0,0 +1,82 @@
+# Ringo Radar - positions - code by ringokakiage #
+import numpy as np
+import pandas as pd
+
+POSITION_COLUMNS = ["Primary position", "Secondary position", "Third position"]
+
+# Define the position map
+position_map = {
+    "GK": "GK",
+    "CB": "CB",
+    "RCB": "CB",
+    "LCB": "CB",
+    "RCB3": "CB",
+    "LCB3": "CB",
+    "LB": "LB",
+    "LWB": "LB",
+    "RB": "RB",
+    "RWB": "RB",
+    "RB5": "RB",
+    "LB5": "LB",
+    "DMF": "DMF",
+    "LDMF": "DMF",
+    "RDMF": "DMF",
+    "CMF": "CMF",
+    "LCMF": "CMF",
+    "RCMF": "CMF",
+    "CMF3": "CMF",
+    "LCMF3": "CMF",
+    "RCMF3": "CMF",
+    "AMF": "AMF",
+    "LAMF": "AMF",
+    "RAMF": "AMF",
+    "CF": "CF",
+    "LW": "WIN",
+    "RW": "WIN",
+    "LWF": "WIN",
+    "RWF": "WIN"
+}
+
+
+def normalize_positions(df, position_map):
+    # Returns a new frame, the original one is left untouched
+    normalized = {
+        col: df[col].map(lambda x: position_map.get(x, x) if pd.notna(x) else "Unknown")
+        for col in POSITION_COLUMNS
+    }
+    return df.assign(**normalized)
+
+# Canonical position keys, each one has its own comparison pool
+POSITION_KEYS = list(dict.fromkeys(position_map.values()))
+POSITION_BITS = {key: 1 << i for i, key in enumerate(POSITION_KEYS)}
+
+# A player is counted once per team, league and position string
+DEDUP_COLUMNS = ["Wyscout id", "Team within selected timeframe", "League", "Position"]
+
+
+def position_mask(df):
+    # One bit per canonical position key, set when any of the three position columns has it.
+    # Works on raw or normalized position columns.
+    mask = np.zeros(df.shape[0], dtype=np.uint16)
+    for col in POSITION_COLUMNS:
+        categorical = pd.Categorical(df[col])
+        # The extra 0 at the end is picked by the -1 code of missing values
+        bits = np.array(
+            [POSITION_BITS.get(position_map.get(value, value), 0) for value in categorical.categories] + [0],
+            dtype=np.uint16,
+        )
+        mask |= bits[categorical.codes]
+    return mask
+
+
+def has_position(df, position_key):
+    return (position_mask(df) & POSITION_BITS.get(position_key, 0)) != 0
+
+
+def create_position_dfs(df, min_minutes):
+    # Every canonical position pool in one pass. Duplicated rows share the same
+    # Position string, hence the same position columns, so dedup is done once.
+    eligible = df[df["Minutes played"] >= min_minutes]
+    eligible = eligible.drop_duplicates(subset=DEDUP_COLUMNS, keep="first")
+    mask = position_mask(eligible)
+    return {key: eligible[(mask & bit) != 0] for key, bit in POSITION_BITS.items()}
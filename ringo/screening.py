@@ -0,0 +1,94 @@
+# Ringo Radar - shortlist screening - code by ringokakiage #
+#
+#   # CB or LB, younger than 24, 500+ minutes, 80th percentile or better in Aerial impact
+#   # and wDpwC against the players of their own league
+#   result = screen(engine, ["CB", "LB"], {"Aerial impact": 80, "wDpwC": 80}, SCOPE_LEAGUE,
+#                   min_minutes=500, max_age=23)
+#   page(result, 1, page_size=50)
+#   result.to_csv(index=False)
+#
+# Every condition is a boolean mask over the percentile matrix of a position pool (a row per
+# player, a column per metric) and over the attribute columns of the same rows, so a query
+# is a few numpy comparisons per pool. Only the matching rows are turned into a DataFrame.
+import math
+
+import numpy as np
+import pandas as pd
+
+from ringo.data import ID_COLUMN
+from ringo.engine import LEADERBOARD_COLUMNS, SCOPE_ALL, SCOPE_LEAGUE, normalize_scope
+from ringo.plot import DEFAULT_MIN_MINUTES
+from ringo.positions import POSITION_KEYS
+
+PAGE_SIZE = 50
+
+# Mean of the percentiles the query puts a minimum on (of every metric when none), the default order
+SCORE_COLUMN = "Mean percentile"
+
+
+def screen(engine, positions=POSITION_KEYS, min_percentiles=None, scope=SCOPE_ALL, min_minutes=DEFAULT_MIN_MINUTES,
+           min_age=None, max_age=None, leagues=None, sort_by=SCORE_COLUMN, ascending=False):
+    # Every player of the position pools meeting all the conditions, one row per pool they
+    # match in. Metric columns hold percentiles (0-100), in the given scope. Ages are inclusive.
+    matrix = engine.percentile_matrix(min_minutes)
+    min_percentiles = dict(min_percentiles or {})
+    unknown = [metric for metric in min_percentiles if metric not in matrix.metrics]
+    if unknown:
+        raise ValueError(f"Unknown metrics {unknown}, expected some of {matrix.metrics}")
+    same_league = normalize_scope(scope) == SCOPE_LEAGUE
+    constrained = [matrix.metrics.index(metric) for metric in min_percentiles]
+    thresholds = np.array(list(min_percentiles.values()), dtype=float)
+    scored = constrained or list(range(len(matrix.metrics)))
+
+    df = engine.df
+    ages = df["Age"].to_numpy()
+    league_mask = None
+    if leagues:
+        league_mask = df["League"].isin(list(leagues)).to_numpy()
+
+    row_ids, keys, percentiles = [], [], []
+    for position_key in positions:
+        table = matrix.table(min_minutes, same_league, position_key)
+        if table is None:
+            continue
+        pool_rows, pool_percentiles = table
+        rows = df.index.get_indexer(pool_rows)
+        keep = (pool_percentiles[:, constrained] >= thresholds).all(axis=1)
+        if min_age is not None:
+            keep &= ages[rows] >= min_age
+        if max_age is not None:
+            keep &= ages[rows] <= max_age
+        if league_mask is not None:
+            keep &= league_mask[rows]
+        row_ids.append(pool_rows[keep])
+        keys.append(np.full(int(keep.sum()), position_key, dtype=object))
+        percentiles.append(pool_percentiles[keep])
+
+    columns = [ID_COLUMN] + LEADERBOARD_COLUMNS + ["Position key"]
+    if not row_ids:
+        return pd.DataFrame(columns=columns + [SCORE_COLUMN] + matrix.metrics)
+    row_ids = np.concatenate(row_ids)
+    percentiles = np.concatenate(percentiles)
+    result = df.loc[row_ids, columns[:-1]].reset_index(drop=True)
+    result["Position key"] = np.concatenate(keys)
+    result[SCORE_COLUMN] = np.nanmean(percentiles[:, scored], axis=1)
+    for i, metric in enumerate(matrix.metrics):
+        result[metric] = percentiles[:, i]
+    if sort_by is not None:
+        if sort_by not in result.columns:
+            raise ValueError(f"Can't sort by {sort_by!r}, expected one of {list(result.columns)}")
+        # Ties in name order
+        by = list(dict.fromkeys([sort_by, "Player"]))
+        result = result.sort_values(by, ascending=[ascending, True][:len(by)], na_position="last", kind="stable",
+                                    ignore_index=True)
+    return result
+
+
+def page_count(result, page_size=PAGE_SIZE):
+    return max(1, math.ceil(len(result) / page_size))
+
+
+def page(result, number, page_size=PAGE_SIZE):
+    # Rows of page number (from 1), an empty frame past the last page
+    start = (max(number, 1) - 1) * page_size
+    return result.iloc[start:start + page_size]
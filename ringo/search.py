@@ -0,0 +1,114 @@
+# Ringo Radar - player name search - code by ringokakiage #
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+
+def normalize_text(text):
+    # "Vélez" and "velez" are the same search key
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NameIndex:
+    # Search index over player names. Every (player, team, league, Wyscout id) is one entry
+    # that points to the first row id it was found in, teammates with the same name are two
+    # entries. Entries are sorted by normalized name, so an entry number is also its
+    # alphabetical rank and matches come out ordered:
+    #   1. names starting with the query (exact matches first)
+    #   2. names with a word starting with the query
+    #   3. names containing the query anywhere (trigram inverted index)
+    #   4. players of the teams, then of the leagues, containing the query (the few hundred
+    #      team and league names are scanned)
+    def __init__(self, df):
+        entries = df.drop_duplicates(subset=["Player", "Team within selected timeframe", "League", "Wyscout id"],
+                                     keep="first")
+        names = [normalize_text(name) for name in entries["Player"]]
+        order = sorted(range(len(names)), key=names.__getitem__)
+        self.names = [names[i] for i in order]
+        row_ids = entries.index.tolist()
+        self.row_ids = [row_ids[i] for i in order]
+
+        # Normalized team or league name -> its entries, in alphabetical order
+        self._groups = []
+        for column in ("Team within selected timeframe", "League"):
+            groups = {}
+            values = entries[column].to_numpy(dtype=object)
+            for entry, i in enumerate(order):
+                groups.setdefault(normalize_text(values[i]), []).append(entry)
+            self._groups.append(groups)
+
+        postings = {}
+        words = []
+        for entry, name in enumerate(self.names):
+            for gram in trigrams(name):
+                postings.setdefault(gram, []).append(entry)
+            words.extend((word, entry) for word in name.split())
+        # Entries are appended in order, every posting list is already sorted
+        self._postings = {gram: np.array(entries_, dtype=np.int32) for gram, entries_ in postings.items()}
+        words.sort()
+        self._words = [word for word, _ in words]
+        self._word_entries = np.array([entry for _, entry in words], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _prefix_range(sorted_list, prefix):
+        return bisect_left(sorted_list, prefix), bisect_left(sorted_list, prefix + "\uffff")
+
+    def _substring_candidates(self, query):
+        # Entries having every trigram of the query, in alphabetical order
+        postings = []
+        for gram in trigrams(query):
+            posting = self._postings.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+            if candidates.size == 0:
+                break
+        return candidates.tolist()
+
+    def search(self, query, limit=50):
+        # Row ids of the best matches, best first
+        query = normalize_text(query)
+        if not query:
+            return []
+        found = []
+        seen = set()
+
+        def add(entries, check=None):
+            for entry in entries:
+                if entry not in seen and (check is None or check(entry)):
+                    seen.add(entry)
+                    found.append(entry)
+                    if len(found) >= limit:
+                        return True
+            return False
+
+        start, end = self._prefix_range(self.names, query)
+        if add(range(start, end)):
+            return [self.row_ids[entry] for entry in found]
+
+        start, end = self._prefix_range(self._words, query)
+        if add(np.unique(self._word_entries[start:end]).tolist()):
+            return [self.row_ids[entry] for entry in found]
+
+        if len(query) >= 3:
+            if add(self._substring_candidates(query), lambda entry: query in self.names[entry]):
+                return [self.row_ids[entry] for entry in found]
+
+        for groups in self._groups:
+            for name, entries in groups.items():
+                if query in name and add(entries):
+                    return [self.row_ids[entry] for entry in found]
+        return [self.row_ids[entry] for entry in found]
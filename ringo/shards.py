@@ -0,0 +1,283 @@
+# Ringo Radar - one database file per league - code by ringokakiage #
+#
+#   python -m ringo.shards database_jan25.csv      ->   database_jan25.shards/
+#                                                           manifest.json
+#                                                           ARG_Copa_de_la_Liga.csv
+#                                                           BRA_Serie_A.csv ...
+#
+# Each shard is a plain database CSV with the rows of one league, keeping the row ids of the
+# source file, so every shard can also get its own snapshot. A same league comparison only
+# needs one shard: ShardedDataset.league_engine() loads just that one. The manifest names the
+# source CSV and its sha256, engines over the shards take both as theirs, so the percentile
+# matrix, the versions and the cache keys of the source CSV stay valid. python -m ringo.ingest
+# rewrites the shards of the CSV it changes.
+# The whole database is loaded shard by shard on a thread pool, each worker also building the
+# position pools of its league, so once the last shard is in only concatenations are left.
+#
+#   dataset = ShardedDataset("database_jan25.shards")
+#   dataset.engine("league", "ARG Copa de la Liga")    # that league only
+#   dataset.engine("all")                              # every league
+import argparse
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from ringo.data import (
+    CATEGORY_COLUMNS, CSV_FLOAT_PRECISION, DATABASE_PATH, PLOT_TYPES, build_snapshot, check_columns,
+    freeze_frame, read_database,
+)
+from ringo.engine import SCOPE_LEAGUE, RadarEngine, normalize_scope
+from ringo.export import slugify
+from ringo.positions import POSITION_KEYS, create_position_dfs
+from ringo.snapshot import file_sha256, snapshot_path
+from ringo.timing import stage
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 2
+
+# Threads loading shards (RINGO_LOAD_WORKERS overrides it)
+LOAD_WORKERS = int(os.environ.get("RINGO_LOAD_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+# League engines kept loaded, least recently used dropped first (RINGO_LEAGUE_ENGINES overrides it)
+LEAGUE_ENGINES = int(os.environ.get("RINGO_LEAGUE_ENGINES", "8"))
+
+
+def shards_path(csv_path):
+    # database_jan25.csv -> database_jan25.shards
+    return os.path.splitext(csv_path)[0] + ".shards"
+
+
+def manifest_path(shards_dir):
+    return os.path.join(shards_dir, MANIFEST_FILE)
+
+
+def is_sharded(shards_dir):
+    return os.path.exists(manifest_path(shards_dir))
+
+
+def read_manifest(shards_dir):
+    with open(manifest_path(shards_dir), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def source_path(shards_dir, manifest):
+    # The CSV the shards were split from, stored relative to the shards directory
+    return os.path.normpath(os.path.join(shards_dir, manifest["source"]))
+
+
+@lru_cache(maxsize=32)
+def _sha256_at(path, mtime_ns, size):
+    # file_sha256 once per version of the file, checked on every rerun of the app
+    return file_sha256(path)
+
+
+def source_sha256(path):
+    stat = os.stat(path)
+    return _sha256_at(path, stat.st_mtime_ns, stat.st_size)
+
+
+def is_current(shards_dir, csv_path=None):
+    # Shards of an older version of the CSV are ignored, like snapshots
+    if not is_sharded(shards_dir):
+        return False
+    manifest = read_manifest(shards_dir)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return False
+    path = source_path(shards_dir, manifest) if csv_path is None else csv_path
+    return os.path.exists(path) and manifest["source_sha256"] == source_sha256(path)
+
+
+def write_shards(csv_path=DATABASE_PATH, shards_dir=None):
+    # Splits the CSV by League, rows keep their order and row ids
+    shards_dir = shards_path(csv_path) if shards_dir is None else shards_dir
+    os.makedirs(shards_dir, exist_ok=True)
+    # Read like ingest does, so the rows of an untouched league are written back byte for byte
+    raw = pd.read_csv(csv_path, index_col=0, float_precision=CSV_FLOAT_PRECISION)
+    previous = read_manifest(shards_dir) if is_sharded(shards_dir) else {}
+    previous_sha256 = {shard["file"]: shard["sha256"] for shard in previous.get("shards", [])}
+    shards = []
+    files = set()
+    for league, rows in raw.groupby("League", sort=True):
+        file_name = slugify(league) or "league"
+        while file_name + ".csv" in files:
+            file_name += "_"
+        file_name += ".csv"
+        files.add(file_name)
+        path = os.path.join(shards_dir, file_name)
+        rows.to_csv(path + ".tmp")
+        sha256 = file_sha256(path + ".tmp")
+        if sha256 == previous_sha256.get(file_name) and os.path.exists(path):
+            # Same league rows as before: the shard, its snapshot and loaded engines stay valid
+            os.remove(path + ".tmp")
+        else:
+            os.replace(path + ".tmp", path)
+            if os.path.isdir(snapshot_path(path)):
+                build_snapshot(path)
+        shards.append({"league": league, "file": file_name, "rows": int(rows.shape[0]), "sha256": sha256})
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "source": os.path.relpath(csv_path, shards_dir),
+        "source_sha256": file_sha256(csv_path),
+        "columns": list(raw.columns),
+        "shards": shards,
+    }
+    # Written last, a half written directory has no manifest and is never read
+    with open(manifest_path(shards_dir) + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(manifest_path(shards_dir) + ".tmp", manifest_path(shards_dir))
+    return shards_dir
+
+
+def concat_frames(frames):
+    # One frozen frame with the rows of every frame, in row id order. Text columns get sorted
+    # categories, like a frame read in one go.
+    frames = [frame for frame in frames if frame.shape[0]] or frames[:1]
+    index = frames[0].index.append([frame.index for frame in frames[1:]])
+    order = None if index.is_monotonic_increasing else np.argsort(index.to_numpy(), kind="stable")
+    columns = {}
+    for col in frames[0].columns:
+        if col in CATEGORY_COLUMNS:
+            values = union_categoricals([pd.Categorical(frame[col]) for frame in frames], sort_categories=True)
+        else:
+            values = np.concatenate([frame[col].to_numpy() for frame in frames])
+        columns[col] = values if order is None else values[order]
+    return freeze_frame(pd.DataFrame(columns, index=index if order is None else index[order]))
+
+
+class ShardedDataset:
+    # The leagues of a sharded database and their engines: one engine per league, loaded
+    # when first asked for, and one engine over every league. Safe to share between threads.
+    def __init__(self, shards_dir, workers=LOAD_WORKERS, league_engines=LEAGUE_ENGINES, plot_types=PLOT_TYPES,
+                 memory_budget=None):
+        self.shards_dir = shards_dir
+        self.manifest = read_manifest(shards_dir)
+        if self.manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"{manifest_path(shards_dir)} has version {self.manifest.get('version')}, "
+                             f"expected {MANIFEST_VERSION}: run python -m ringo.shards again")
+        # Engines take the source CSV as their database: its percentile matrix and versions
+        # apply to the shards, and radars keep the cache keys of the unsharded engine
+        self.source_path = source_path(shards_dir, self.manifest)
+        self.dataset_hash = self.manifest["source_sha256"]
+        self.workers = workers
+        self.league_engines = league_engines
+        self.plot_types = plot_types
+        self.memory_budget = memory_budget
+        self.shards = {shard["league"]: shard for shard in self.manifest["shards"]}
+        self._engines = OrderedDict()
+        self._global_engine = None
+        self._lock = threading.Lock()
+        self._global_lock = threading.Lock()
+        check_columns(manifest_path(shards_dir), self.manifest["columns"], plot_types)
+
+    @property
+    def leagues(self):
+        return list(self.shards)
+
+    def shard_path(self, league):
+        shard = self.shards.get(league)
+        if shard is None:
+            raise KeyError(f"No shard for league {league!r} in {self.shards_dir}")
+        return os.path.join(self.shards_dir, shard["file"])
+
+    def read_shard(self, league):
+        # (rows of the league, its position pools without minutes threshold)
+        df = read_database(self.shard_path(league), self.plot_types)
+        return df, create_position_dfs(df, 0)
+
+    def league_engine(self, league):
+        # Engine over the rows of one league, enough for same league comparisons
+        with self._lock:
+            engine = self._engines.get(league)
+            if engine is not None:
+                self._engines.move_to_end(league)
+                return engine
+        with stage("shard_load"):
+            df, position_dfs = self.read_shard(league)
+        # Not to be refreshed: it would reload the whole source CSV. A new manifest means a new dataset.
+        engine = RadarEngine(self.source_path, df=df, position_dfs=position_dfs,
+                             memory_budget=self.memory_budget, dataset_hash=self.dataset_hash)
+        with self._lock:
+            engine = self._engines.setdefault(league, engine)
+            self._engines.move_to_end(league)
+            while len(self._engines) > self.league_engines:
+                self._engines.popitem(last=False)
+        return engine
+
+    def load(self, on_shard=None):
+        # (every row, position pools without minutes threshold). Leagues with a loaded engine
+        # are reused, the other shards are read in parallel. on_shard(league, done, total)
+        # is called as each one comes in.
+        with self._lock:
+            loaded = {league: (engine.df, engine.minutes_index().position_dfs)
+                      for league, engine in self._engines.items()}
+        parts = dict(loaded)
+        total = len(self.shards)
+        if on_shard is not None:
+            for done, league in enumerate(loaded, 1):
+                on_shard(league, done, total)
+        missing = [league for league in self.shards if league not in loaded]
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            futures = {executor.submit(self.read_shard, league): league for league in missing}
+            for future in as_completed(futures):
+                parts[futures[future]] = future.result()
+                if on_shard is not None:
+                    on_shard(futures[future], len(parts), total)
+
+        df = concat_frames([parts[league][0] for league in self.shards])
+        # Pools are rows of df: the row ids each worker found are enough, in df order
+        position_dfs = {}
+        for key in POSITION_KEYS:
+            row_ids = np.concatenate([parts[league][1][key].index.to_numpy() for league in self.shards])
+            position_dfs[key] = df.iloc[np.sort(df.index.get_indexer(row_ids))]
+        return df, position_dfs
+
+    def global_engine(self, on_shard=None):
+        # Engine over every league, loaded once
+        with self._global_lock:
+            if self._global_engine is None:
+                with stage("shard_load"):
+                    df, position_dfs = self.load(on_shard)
+                self._global_engine = RadarEngine(self.source_path, df=df, position_dfs=position_dfs,
+                                                  memory_budget=self.memory_budget, dataset_hash=self.dataset_hash)
+            return self._global_engine
+
+    def loaded_engines(self):
+        # Engines built so far, the global one first
+        with self._lock:
+            engines = list(self._engines.values())
+        return ([self._global_engine] if self._global_engine is not None else []) + engines
+
+    def engine(self, scope, league=None):
+        if normalize_scope(scope) == SCOPE_LEAGUE and league is not None:
+            return self.league_engine(league)
+        return self.global_engine()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ringo.shards",
+                                     description="Split the database into one CSV per league.")
+    parser.add_argument("database", nargs="?", default=DATABASE_PATH)
+    parser.add_argument("--out", help="shards directory (default: next to the database, database_jan25.shards)")
+    parser.add_argument("--snapshots", action="store_true",
+                        help="also build the snapshot of every shard (ringo.snapshot), the fastest to load")
+    args = parser.parse_args(argv)
+
+    shards_dir = write_shards(args.database, args.out)
+    manifest = read_manifest(shards_dir)
+    print(f"{args.database} -> {shards_dir} ({len(manifest['shards'])} leagues, "
+          f"{sum(shard['rows'] for shard in manifest['shards'])} rows)")
+    if args.snapshots:
+        for shard in manifest["shards"]:
+            build_snapshot(os.path.join(shards_dir, shard["file"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Ringo Radar - similar players - code by ringokakiage #
+import numpy as np
+from scipy.spatial import cKDTree
+
+from ringo.data import METRIC_COLUMNS
+from ringo.percentiles import rank_percentiles
+
+TRANSFORMS = ("zscore", "percentile")
+
+
+def transform_metrics(values, transform="zscore"):
+    # Puts every metric on the same scale, so no metric dominates the distance
+    if transform == "zscore":
+        std = values.std(axis=0)
+        std[std == 0] = 1.0
+        return (values - values.mean(axis=0)) / std
+    if transform == "percentile":
+        return np.column_stack([
+            rank_percentiles(np.sort(values[:, i]), values[:, i]) for i in range(values.shape[1])
+        ])
+    raise ValueError(f"transform can only be one of {TRANSFORMS}, got {transform!r}")
+
+
+class SimilarityIndex:
+    # One KD-tree per position pool over the Ringo metrics. Pools should be built without
+    # a minutes threshold, min_minutes is applied as a filter so the trees only have to be
+    # rebuilt when the dataset changes.
+    def __init__(self, position_dfs, metrics=METRIC_COLUMNS, transform="zscore"):
+        self.metrics = list(metrics)
+        self.transform = transform
+        self._pools = {}
+        for position_key, pool in position_dfs.items():
+            self._add_pool(position_key, pool)
+
+    def _add_pool(self, position_key, pool):
+        self._pools.pop(position_key, None)
+        if pool.empty:
+            return
+        points = transform_metrics(pool[self.metrics].to_numpy(dtype=float), self.transform)
+        self._pools[position_key] = (pool, points, cKDTree(points))
+
+    def update(self, position_dfs, changed):
+        # New index where only the trees of the changed pools are rebuilt
+        index = SimilarityIndex({}, self.metrics, self.transform)
+        index._pools = {key: value for key, value in self._pools.items() if key not in changed}
+        for position_key in changed:
+            index._add_pool(position_key, position_dfs[position_key])
+        return index
+
+    def pool(self, position_key):
+        if position_key not in self._pools:
+            raise KeyError(f"No data available for position: {position_key}")
+        return self._pools[position_key][0]
+
+    def similar(self, position_key, row_id, k=10, league=None, min_age=None, max_age=None, min_minutes=None):
+        # The k players closest to row_id in the position pool, closest first, with a Distance column
+        if position_key not in self._pools:
+            raise KeyError(f"No data available for position: {position_key}")
+        pool, points, tree = self._pools[position_key]
+        position = pool.index.get_loc(row_id)
+
+        keep = np.ones(pool.shape[0], dtype=bool)
+        if league is not None:
+            keep &= (pool["League"] == league).to_numpy()
+        if min_age is not None:
+            keep &= (pool["Age"] >= min_age).to_numpy()
+        if max_age is not None:
+            keep &= (pool["Age"] <= max_age).to_numpy()
+        if min_minutes is not None:
+            keep &= (pool["Minutes played"] >= min_minutes).to_numpy()
+        keep[position] = False
+        available = int(keep.sum())
+        if available == 0 or k <= 0:
+            return pool.iloc[[]].assign(Distance=np.array([], dtype=float))
+
+        # Ask the tree for more neighbours until enough of them pass the filters
+        n_query = min(pool.shape[0], 4 * k + 1)
+        while True:
+            distances, positions = tree.query(points[position], k=n_query)
+            distances, positions = np.atleast_1d(distances), np.atleast_1d(positions)
+            matches = keep[positions]
+            if matches.sum() >= min(k, available) or n_query == pool.shape[0]:
+                break
+            n_query = min(pool.shape[0], n_query * 2)
+
+        distances, positions = distances[matches][:k], positions[matches][:k]
+        return pool.iloc[positions].assign(Distance=np.around(distances, 3))
@@ -0,0 +1,134 @@
+# Ringo Radar - binary columnar snapshots of the database - code by ringokakiage #
+#
+# A snapshot is a directory with one .npy file per column plus meta.json, which holds
+# the schema, the string tables of the dictionary encoded columns and the hash of the
+# CSV it was built from. Columns are memory-mapped when loaded, so worker processes
+# share the same page cache instead of each parsing the CSV.
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_VERSION = 1
+META_FILE = "meta.json"
+
+
+class StaleSnapshotError(Exception):
+    pass
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_path(csv_path):
+    # database_jan25.csv -> database_jan25.snapshot
+    return os.path.splitext(csv_path)[0] + ".snapshot"
+
+
+def _codes_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def write_snapshot(df, snapshot_dir, source_sha256, schema):
+    os.makedirs(snapshot_dir, exist_ok=True)
+    columns = []
+    for i, col in enumerate(df.columns):
+        file_name = f"col_{i}.npy"
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(series.dtype):
+            # Dictionary encoded: codes on disk, strings in meta.json
+            categorical = pd.Categorical(series)
+            codes = categorical.codes.astype(_codes_dtype(len(categorical.categories)))
+            np.save(os.path.join(snapshot_dir, file_name), codes)
+            columns.append({
+                "name": col,
+                "file": file_name,
+                "encoding": "category" if isinstance(series.dtype, pd.CategoricalDtype) else "string",
+                "strings": [str(value) for value in categorical.categories],
+            })
+        else:
+            np.save(os.path.join(snapshot_dir, file_name), series.to_numpy())
+            columns.append({"name": col, "file": file_name, "encoding": "plain"})
+    np.save(os.path.join(snapshot_dir, "index.npy"), df.index.to_numpy())
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "source_sha256": source_sha256,
+        "rows": int(df.shape[0]),
+        "schema": schema,
+        "columns": columns,
+    }
+    # meta.json is written last, a half written snapshot is never considered valid
+    tmp_path = os.path.join(snapshot_dir, META_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(snapshot_dir, META_FILE))
+    return snapshot_dir
+
+
+def read_snapshot_meta(snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != SNAPSHOT_VERSION:
+        return None
+    return meta
+
+
+def load_snapshot(snapshot_dir, source_sha256=None, schema=None, columns=None):
+    # columns: only these are mapped (None for all of them), in the snapshot's order
+    meta = read_snapshot_meta(snapshot_dir)
+    if meta is None:
+        raise StaleSnapshotError(f"No valid snapshot in {snapshot_dir}")
+    if source_sha256 is not None and meta["source_sha256"] != source_sha256:
+        raise StaleSnapshotError(f"Snapshot {snapshot_dir} was built from another version of the data")
+    if schema is not None and meta["schema"] != schema:
+        raise StaleSnapshotError(f"Snapshot {snapshot_dir} was built with another schema")
+    stored = meta["columns"]
+    if columns is not None:
+        wanted = set(columns)
+        missing = wanted - {column["name"] for column in stored}
+        if missing:
+            raise StaleSnapshotError(f"Snapshot {snapshot_dir} has no column {', '.join(sorted(missing))}")
+        stored = [column for column in stored if column["name"] in wanted]
+
+    columns = {}
+    for column in stored:
+        values = np.load(os.path.join(snapshot_dir, column["file"]), mmap_mode="r")
+        if column["encoding"] == "category":
+            columns[column["name"]] = pd.Categorical.from_codes(values, column["strings"])
+        elif column["encoding"] == "string":
+            columns[column["name"]] = np.asarray(column["strings"], dtype=object)[values]
+        else:
+            columns[column["name"]] = values
+    index = np.load(os.path.join(snapshot_dir, "index.npy"), mmap_mode="r")
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def main(argv=None):
+    # python -m ringo.snapshot [database.csv ...]
+    from ringo.data import DATABASE_PATH, build_snapshot, snapshot_is_fresh
+
+    paths = (argv if argv is not None else sys.argv[1:]) or [DATABASE_PATH]
+    for path in paths:
+        if snapshot_is_fresh(path):
+            print(f"{path}: snapshot is up to date")
+        else:
+            print(f"{path} -> {build_snapshot(path)}")
+
+
+if __name__ == "__main__":
+    main()
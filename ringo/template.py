@@ -0,0 +1,116 @@
+# Ringo Radar - pre-drawn radar template - code by ringokakiage #
+#
+# Most of a radar is the same for every player: background, parameter labels and the
+# slice colors legend. A RadarTemplate draws one radar once, keeps those parts as a
+# rasterized background, and for every player restores it and draws only what changes
+# (slices, grid, value boxes, title, subtitle and credits) on top, then writes the PNG.
+# Raster output only, vector formats (pdf, svg) still go through draw_pizza_plot.
+import io
+import threading
+from functools import lru_cache
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.text import Text
+from PIL import Image
+
+from ringo.plot import (
+    DEFAULT_MIN_MINUTES, close_figure, draw_pizza_plot, pizza_var_names_spaced_dict, radar_texts, slice_color,
+    text_color, value_texts,
+)
+
+# savefig's default padding around the bbox_inches="tight" box
+TIGHT_PAD_INCHES = 0.1
+
+# The blank space behind every slice, same alpha as draw_pizza_plot
+BLANK_ALPHA = 0.25
+
+
+class RadarTemplate:
+    def __init__(self, plot_type="metrics", dpi=200):
+        self.plot_type = plot_type
+        self.dpi = dpi
+        self._lock = threading.Lock()
+
+        # Any values work, everything that depends on them is redrawn for each player
+        params = pizza_var_names_spaced_dict[plot_type]
+        placeholder = {
+            'position_key': '', 'player_row': {'League': '', 'Age': '', 'Primary position': '',
+                                               'Team within selected timeframe': '', 'Minutes played': ''},
+            'num_players': 0, 'num_leagues': 0, 'columns': [], 'params': params,
+            'values': [0.0] * len(params), 'percentiles': np.full(len(params), 50.0),
+        }
+        self.fig, self.ax = draw_pizza_plot(("", "", "", ""), placeholder, plot_type)
+        # Out of pyplot, on its own Agg canvas: Streamlit closes every pyplot figure after
+        # each rerun, which would leave the template without a canvas to draw on
+        plt.close(self.fig)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.fig.set_dpi(dpi)
+
+        self.slices = [patch for patch in self.ax.patches if patch.get_zorder() == 2]
+        self.blank_slices = [patch for patch in self.ax.patches if patch.get_zorder() == 1]
+        self.value_texts = [text for text in self.ax.texts if text.get_gid() == "value"]
+        self.fig_texts = {text.get_gid(): text for text in self.fig.texts if text.get_gid()}
+
+        # Redrawn for every player in the order matplotlib draws them: the blank space is the
+        # lowest artist that changes, so everything of the axes above it (grid lines, slices,
+        # the inner circle) is redrawn too, then the figure texts. Parameter labels stay in the
+        # background, they are drawn at 110, outside of the slices.
+        lowest = min(patch.get_zorder() for patch in self.blank_slices)
+        axes_artists = [artist for artist in self.ax.get_children()
+                        if artist is not self.ax.patch and artist.get_zorder() >= lowest
+                        and not (isinstance(artist, Text) and artist.get_gid() is None)]
+        self.dynamic_artists = (sorted(axes_artists, key=lambda artist: artist.get_zorder())
+                                + list(self.fig_texts.values()))
+        for artist in self.dynamic_artists:
+            artist.set_animated(True)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def update(self, player_info, pizza_values, value_display="Percentile", min_minutes=DEFAULT_MIN_MINUTES):
+        percentiles = pizza_values['percentiles']
+        for patch, blank, text, percentile, label in zip(self.slices, self.blank_slices, self.value_texts,
+                                                         percentiles, value_texts(pizza_values, value_display)):
+            color = slice_color(percentile)
+            patch.set_height(percentile)
+            patch.set_facecolor(color)
+            blank.set_facecolor(patch.get_facecolor())
+            blank.set_alpha(BLANK_ALPHA)
+            text.set_y(percentile)
+            text.set_text(label)
+            text.set_color(text_color(color))
+            text.get_bbox_patch().set_facecolor(color)
+        texts = radar_texts(player_info, pizza_values, self.plot_type, value_display, min_minutes)
+        self.fig_texts["title"].set_text(texts["title"])
+        self.fig_texts["subtitle"].set_text(texts["subtitle"])
+        self.fig_texts["credits"].set_text("\n".join(texts["credits"]))
+
+    def render_png(self, player_info, pizza_values, value_display="Percentile", min_minutes=DEFAULT_MIN_MINUTES):
+        # Same picture as savefig(format="png", bbox_inches="tight") of draw_pizza_plot's figure
+        with self._lock:
+            self.update(player_info, pizza_values, value_display, min_minutes)
+            self.canvas.restore_region(self.background)
+            for artist in self.dynamic_artists:
+                self.fig.draw_artist(artist)
+
+            # Crop of the tight box, rounded the way savefig sizes and places it
+            bbox = self.fig.get_tightbbox(self.canvas.get_renderer()).padded(TIGHT_PAD_INCHES)
+            width, height = int(bbox.width * self.dpi), int(bbox.height * self.dpi)
+            left = max(0, round(bbox.x0 * self.dpi))
+            top = max(0, self.canvas.get_width_height()[1] - round(bbox.y0 * self.dpi) - height)
+            # The figure background is opaque: RGB is smaller than savefig's RGBA and faster to encode
+            pixels = np.asarray(self.canvas.buffer_rgba())[top:top + height, left:left + width, :3].copy()
+
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format="png")
+        return buffer.getvalue()
+
+    def close(self):
+        close_figure(self.fig)
+
+
+@lru_cache(maxsize=None)
+def radar_template(plot_type="metrics", dpi=200):
+    # One template per plot type and resolution, shared by every engine of the process
+    return RadarTemplate(plot_type, dpi)
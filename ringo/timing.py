@@ -0,0 +1,101 @@
+# Ringo Radar - per rerun stage timings - code by ringokakiage #
+#
+#   timer = start_timer("radar", enabled=True)
+#   with stage("search"):
+#       ...
+#   record = timer.finish()   # {"name": "radar", "total_ms": ..., "stages": [...]}
+#
+# stage() can be called anywhere (engine, plot, data loading): it times into the timer of
+# the current thread, and costs one context variable lookup when no timer is running.
+# Finished records are logged as JSON on the "ringo.timing" logger and the latest ones
+# are kept in memory for recent_records() and stage_summary().
+# Set RINGO_TIMING=1 to time every rerun, otherwise only when the app asks for it.
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+
+TIMING_ENABLED = os.environ.get("RINGO_TIMING") == "1"
+
+# Finished records kept in memory, for every session of the process
+RECENT_RECORDS = 200
+
+logger = logging.getLogger("ringo.timing")
+
+_current = contextvars.ContextVar("ringo_timer", default=None)
+_recent = deque(maxlen=RECENT_RECORDS)
+_recent_lock = threading.Lock()
+_NOT_TIMED = contextlib.nullcontext()
+
+
+class Timer:
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        self.stages = []
+        self._start = time.perf_counter()
+        self._token = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, (time.perf_counter() - start) * 1000))
+
+    def finish(self):
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+        record = {
+            "name": self.name,
+            "started_at": self.started_at,
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            "stages": [{"stage": name, "ms": round(ms, 3)} for name, ms in self.stages],
+        }
+        with _recent_lock:
+            _recent.append(record)
+        logger.info(json.dumps(record, ensure_ascii=False))
+        return record
+
+
+def start_timer(name, enabled=False):
+    # Timer for the current thread, None when timing is off
+    if not (enabled or TIMING_ENABLED):
+        _current.set(None)
+        return None
+    timer = Timer(name)
+    timer._token = _current.set(timer)
+    return timer
+
+
+def stage(name):
+    timer = _current.get()
+    if timer is None:
+        return _NOT_TIMED
+    return timer.stage(name)
+
+
+def recent_records():
+    with _recent_lock:
+        return list(_recent)
+
+
+def stage_summary():
+    # {stage: {"count", "p50_ms", "p95_ms"}} over the recent records
+    times = {}
+    for record in recent_records():
+        for entry in record["stages"]:
+            times.setdefault(entry["stage"], []).append(entry["ms"])
+    return {
+        name: {"count": len(ms), "p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95))}
+        for name, ms in times.items()
+    }
@@ -0,0 +1,122 @@
+# Ringo Radar - resources shared by the pages of the Streamlit app - code by ringokakiage #
+import json
+
+import pandas as pd
+import streamlit as st
+
+from ringo.data import DATABASE_PATH
+from ringo.engine import SCOPE_LEAGUE, RadarEngine, normalize_scope
+from ringo.history import DatabaseHistory
+from ringo.search import NameIndex
+from ringo.shards import ShardedDataset, is_current, read_manifest, shards_path
+from ringo.timing import recent_records, stage_summary
+
+
+# The radar engine owns the database, the position pools and the rendered radars.
+# It is shared by every session and page, never mutate its data.
+@st.cache_resource
+def _create_engine():
+    return RadarEngine()
+
+
+def _shared_engine():
+    dataset = get_sharded_dataset()
+    return _create_engine() if dataset is None else dataset.global_engine()
+
+
+def get_engine():
+    # New ingestions (python -m ringo.ingest) are picked up on the next rerun: the unsharded
+    # engine refreshes its pools, the shards rewritten by the ingestion make a new dataset
+    engine = _shared_engine()
+    if get_sharded_dataset() is None:
+        engine.refresh()
+    return engine
+
+
+@st.cache_resource(max_entries=1)
+def _create_sharded_dataset(shards_dir, source_sha256):
+    return ShardedDataset(shards_dir)
+
+
+def get_sharded_dataset():
+    # The database split by league (python -m ringo.shards), None without up to date shards
+    shards_dir = shards_path(DATABASE_PATH)
+    if not is_current(shards_dir, DATABASE_PATH):
+        return None
+    return _create_sharded_dataset(shards_dir, read_manifest(shards_dir)["source_sha256"])
+
+
+def get_leagues():
+    # Without loading any shard when the database is sharded
+    dataset = get_sharded_dataset()
+    return dataset.leagues if dataset is not None else get_engine().player_lookup().leagues()
+
+
+def get_league_engine(league):
+    # Engine with every row of league: only its shard when sharded, the whole database otherwise
+    dataset = get_sharded_dataset()
+    return get_engine() if dataset is None else dataset.league_engine(league)
+
+
+def get_radar_engine(scope, league):
+    # Same league comparisons only need the league's rows
+    if normalize_scope(scope) == SCOPE_LEAGUE and league is not None:
+        return get_league_engine(league)
+    return get_engine()
+
+
+# Name search index, shared by every session, rebuilt when the data changes
+@st.cache_resource(max_entries=1)
+def _create_search_index(dataset_hash):
+    return NameIndex(_shared_engine().df)
+
+
+def get_search_index():
+    return _create_search_index(get_engine().dataset_hash)
+
+
+# Every dated database next to the app (database_jan25.csv, database_jul25.csv, ...), the
+# current one taken from the app's engine. Rebuilt when the data changes.
+@st.cache_resource(max_entries=1)
+def _create_history(dataset_hash):
+    return DatabaseHistory.discover(".", load_live=lambda: _shared_engine().df)
+
+
+def get_history():
+    # Sharded, every league is only loaded once the current window is asked for
+    dataset = get_sharded_dataset()
+    return _create_history(get_engine().dataset_hash if dataset is None else dataset.dataset_hash)
+
+
+def diagnostics_panel(record):
+    # Stage timings of the rerun that just ran, plus the recent ones of every session
+    with st.sidebar.expander("Diagnóstico de desempenho", expanded=True):
+        st.write(f"Última execução: {record['total_ms']:.0f} ms")
+        st.dataframe(pd.DataFrame(record["stages"], columns=["stage", "ms"]), hide_index=True)
+        summary = stage_summary()
+        if summary:
+            st.caption("Execuções recentes (todas as sessões)")
+            st.dataframe(pd.DataFrame.from_dict(summary, orient="index").rename_axis("stage"))
+        st.download_button("Exportar (JSON)", json.dumps(recent_records(), ensure_ascii=False),
+                           file_name="ringo_timings.json", mime="application/json")
+        memory_panel()
+
+
+def memory_panel():
+    # Process memory and the caches of the shared memory budget (RINGO_MEMORY_BUDGET_MB)
+    # Sharded, only engines already loaded are looked at
+    dataset = get_sharded_dataset()
+    engines = [_create_engine()] if dataset is None else dataset.loaded_engines()
+    if not engines:
+        return
+    usage = engines[0].memory_usage()
+    budget = usage["budget"]
+    mb = 1024 * 1024
+    st.caption("Memória")
+    if usage["rss_bytes"] is not None:
+        st.write(f"Processo: {usage['rss_bytes'] / mb:.0f} MB")
+    st.write(f"Caches: {budget['size_bytes'] / mb:.1f} de {budget['max_bytes'] / mb:.0f} MB "
+             f"({budget['evictions']} descartes), figuras abertas: {usage['open_figures']}")
+    if budget["caches"]:
+        caches = pd.DataFrame.from_dict(budget["caches"], orient="index").rename_axis("cache")
+        st.dataframe(caches.assign(size_mb=caches.pop("size_bytes") / mb))
@@ -0,0 +1,134 @@
+# Ringo Radar - radar drawn in the browser - code by ringokakiage #
+#
+# The server only computes the radar's numbers and texts (radar_payload, a few hundred
+# bytes of JSON); radar_html() holds a small script that draws the same pizza as SVG in
+# the browser. Same geometry as PyPizza: the first slice is centered at 12 o'clock and
+# the others follow clockwise, the inner circle takes 20 of the 120 radius units.
+import hashlib
+import json
+
+import numpy as np
+
+from ringo.plot import DEFAULT_MIN_MINUTES, SLICE_COLOR_BANDS, radar_texts, slice_color, text_color, value_texts
+
+PAYLOAD_VERSION = 1
+
+
+def _number(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def radar_payload(player_info, pizza_values, plot_type, value_display="Percentile", min_minutes=DEFAULT_MIN_MINUTES):
+    # Everything the browser needs to draw the radar, JSON serializable
+    texts = radar_texts(player_info, pizza_values, plot_type, value_display, min_minutes)
+    slices = []
+    for param, value, percentile, label in zip(pizza_values['params'], pizza_values['values'],
+                                                pizza_values['percentiles'], value_texts(pizza_values, value_display)):
+        color = slice_color(percentile)
+        slices.append({
+            "param": param,
+            "value": _number(value),
+            "percentile": _number(percentile),
+            "label": label,
+            "color": color,
+            "text_color": text_color(color),
+        })
+    return {
+        "version": PAYLOAD_VERSION,
+        "title": texts["title"],
+        "subtitle": texts["subtitle"],
+        "credits": texts["credits"],
+        "legend": [{"label": label, "color": color} for _, color, label in SLICE_COLOR_BANDS],
+        "slices": slices,
+    }
+
+
+_RADAR_TEMPLATE = """<div id="__ID__" style="max-width: 720px"></div>
+<script>
+(() => {
+const payload = __PAYLOAD__;
+const NS = "http://www.w3.org/2000/svg";
+const W = 720, H = 720, CX = 360, CY = 370, R = 250, ORIGIN = 20, SPAN = 120;
+const svg = document.createElementNS(NS, "svg");
+svg.setAttribute("viewBox", `0 0 ${W} ${H}`);
+svg.setAttribute("width", "100%");
+svg.style.fontFamily = "Roboto, 'Roboto Slab', sans-serif";
+svg.style.background = "#F2F2F2";
+// Attached first, text sizes are only known once it is in the page
+document.getElementById("__ID__").appendChild(svg);
+
+function el(name, attrs, text) {
+  const node = document.createElementNS(NS, name);
+  for (const [key, value] of Object.entries(attrs)) node.setAttribute(key, value);
+  if (text !== undefined) node.textContent = text;
+  svg.appendChild(node);
+  return node;
+}
+// PyPizza scale: 0 is the edge of the inner circle, 100 the outer circle
+const radius = (value) => R * (ORIGIN + value) / SPAN;
+// Angles are clockwise from 12 o'clock
+const point = (r, angle) => [CX + r * Math.sin(angle), CY - r * Math.cos(angle)];
+function wedge(r0, r1, a0, a1) {
+  const [x0, y0] = point(r0, a0), [x1, y1] = point(r1, a0), [x2, y2] = point(r1, a1), [x3, y3] = point(r0, a1);
+  const large = a1 - a0 > Math.PI ? 1 : 0;
+  return `M${x0},${y0} L${x1},${y1} A${r1},${r1} 0 ${large} 1 ${x2},${y2} L${x3},${y3} A${r0},${r0} 0 ${large} 0 ${x0},${y0} Z`;
+}
+function multiline(x, y, lines, attrs, lineHeight) {
+  const text = el("text", attrs);
+  lines.forEach((line, i) => {
+    const span = document.createElementNS(NS, "tspan");
+    span.setAttribute("x", x);
+    span.setAttribute("y", y + i * lineHeight);
+    span.textContent = line;
+    text.appendChild(span);
+  });
+  return text;
+}
+
+const n = payload.slices.length, width = 2 * Math.PI / n;
+payload.slices.forEach((slice, i) => {
+  const a0 = i * width - width / 2, a1 = a0 + width;
+  const pct = slice.percentile === null ? 0 : Math.max(0, Math.min(100, slice.percentile));
+  el("path", {d: wedge(radius(0), radius(100), a0, a1), fill: slice.color, "fill-opacity": 0.25});
+  el("path", {d: wedge(radius(0), radius(pct), a0, a1), fill: slice.color, stroke: "#F2F2F2", "stroke-width": 1});
+});
+for (const level of [20, 40, 60, 80]) {
+  el("circle", {cx: CX, cy: CY, r: radius(level), fill: "none", stroke: "#F2F2F2", "stroke-dasharray": "6 3 1 3"});
+}
+payload.slices.forEach((slice, i) => {
+  const [x0, y0] = point(radius(0), i * width - width / 2), [x1, y1] = point(radius(100), i * width - width / 2);
+  el("line", {x1: x0, y1: y0, x2: x1, y2: y1, stroke: "#F2F2F2", "stroke-width": 1});
+});
+payload.slices.forEach((slice, i) => {
+  const angle = i * width;
+  const [px, py] = point(radius(110), angle);
+  multiline(px, py, slice.param.split("\\n"), {"text-anchor": "middle", "dominant-baseline": "middle",
+    "font-size": 13}, 15);
+  const pct = slice.percentile === null ? 0 : slice.percentile;
+  const [vx, vy] = point(radius(Math.max(pct, 8)), angle);
+  const box = el("rect", {fill: slice.color, stroke: "#000000", "stroke-width": 1, rx: 2});
+  const label = el("text", {x: vx, y: vy, fill: slice.text_color, "text-anchor": "middle",
+    "dominant-baseline": "central", "font-size": 13}, slice.label);
+  const b = label.getBBox();
+  box.setAttribute("x", b.x - 4); box.setAttribute("y", b.y - 2);
+  box.setAttribute("width", b.width + 8); box.setAttribute("height", b.height + 4);
+});
+el("text", {x: W / 2, y: 26, "text-anchor": "middle", "font-size": 17, "font-weight": "bold"}, payload.title);
+el("text", {x: W / 2, y: 48, "text-anchor": "middle", "font-size": 14, "font-weight": "bold"}, payload.subtitle);
+el("text", {x: 20, y: H - 118, "font-size": 11, "font-style": "italic"}, "Slice colors:");
+payload.legend.forEach((entry, i) => {
+  el("text", {x: 20, y: H - 102 + i * 15, "font-size": 11, "font-style": "italic", fill: entry.color}, entry.label);
+});
+multiline(W - 20, H - 57, payload.credits, {"text-anchor": "end", "font-size": 11, "font-style": "italic"}, 15);
+})();
+</script>
+"""
+
+
+def radar_html(payload):
+    # Self-contained HTML for st.html(..., unsafe_allow_javascript=True), about 4 KB plus the
+    # payload. The page is not an iframe, so every radar gets its own element id.
+    payload_json = json.dumps(payload, ensure_ascii=False).replace("</", "<\\/")
+    element_id = "ringo-radar-" + hashlib.md5(payload_json.encode("utf-8")).hexdigest()[:12]
+    return _RADAR_TEMPLATE.replace("__ID__", element_id).replace("__PAYLOAD__", payload_json)
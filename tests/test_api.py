@@ -0,0 +1,93 @@
+# Ringo Radar - tests of the HTTP JSON API - code by ringokakiage #
+import json
+import os
+
+import pytest
+
+from ringo.api import RadarApi
+from ringo.engine import RadarEngine
+
+DATABASE = os.path.join(os.path.dirname(__file__), os.pardir, "database_jan25.csv")
+ZENON = {"id": "-212141", "position": "LW", "scope": "league", "min_minutes": "600"}
+
+
+@pytest.fixture(scope="module")
+def api():
+    return RadarApi(RadarEngine(DATABASE), refresh_seconds=3600)
+
+
+def get(api, path, params=None, if_none_match=None):
+    status, etag, content_type, body = api.handle(path, params or {}, if_none_match)
+    return status, etag, json.loads(body) if body and content_type.startswith("application/json") else body
+
+
+def test_percentiles_by_id(api):
+    status, etag, body = get(api, "/percentiles", ZENON)
+    assert status == 200 and etag
+    assert (body["player"], body["team"], body["position"]) == ("K. Zenón", "Boca Juniors", "LW")
+    assert body["pool_size"] > 0 and len(body["metrics"]) == 6
+
+
+def test_matching_etag_is_not_modified(api):
+    status, etag, _ = get(api, "/percentiles", ZENON)
+    assert get(api, "/percentiles", ZENON, etag) == (304, etag, b"")
+    assert get(api, "/percentiles", ZENON, f'"other", W/{etag}')[0] == 304
+    assert get(api, "/percentiles", ZENON, "*")[0] == 304
+    assert get(api, "/percentiles", ZENON, '"other"')[0] == 200
+    # Another query or another version of the data is another ETag
+    assert get(api, "/percentiles", {**ZENON, "min_minutes": "500"})[1] != etag
+    other_data = RadarApi(RadarEngine(DATABASE, dataset_hash="other"), refresh_seconds=3600)
+    assert other_data.etag("/percentiles", ZENON) != etag
+
+
+def test_radar_png_etag(api):
+    params = {"id": "-212141", "position": "LW", "dpi": "100"}
+    status, etag, body = get(api, "/radar.png", params)
+    assert status == 200 and body.startswith(b"\x89PNG")
+    assert get(api, "/radar.png", params, etag)[0] == 304
+
+
+def test_teammates_with_the_same_name_by_id(api):
+    first = get(api, "/percentiles", {"id": "73240", "position": "CF", "min_minutes": "0"})[2]
+    second = get(api, "/percentiles", {"id": "290751", "position": "CF", "min_minutes": "0"})[2]
+    assert first["player"] == second["player"] == "G. Fernández"
+    assert first["metrics"] != second["metrics"]
+
+
+@pytest.mark.parametrize("params, status", [
+    ({"q": "zenon", "limit": "0"}, 400),
+    ({"q": "zenon", "limit": "-3"}, 400),
+    ({"q": "zenon", "limit": "x"}, 400),
+    ({}, 400),
+])
+def test_players_bad_parameters(api, params, status):
+    assert get(api, "/players", params)[0] == status
+
+
+def test_players_limit(api):
+    status, _, body = get(api, "/players", {"q": "fernandez", "limit": "3"})
+    assert status == 200 and len(body["players"]) == 3
+
+
+def test_errors(api):
+    assert get(api, "/nope")[0] == 404
+    assert get(api, "/percentiles", {"id": "1", "position": "CB"})[0] == 404
+    assert get(api, "/percentiles", {**ZENON, "scope": "foo"})[0] == 400
+
+
+def test_unexpected_error_is_a_500(api, monkeypatch):
+    def broken(*args, **kwargs):
+        raise KeyError("bug")
+
+    monkeypatch.setattr(api.engine, "pizza_values", broken)
+    params = {**ZENON, "min_minutes": "650"}
+    status, etag, body = get(api, "/percentiles", params)
+    assert status == 500 and "error" in body
+    monkeypatch.undo()
+    # Not cached: the same query works once the bug is gone
+    assert get(api, "/percentiles", params)[0] == 200
+
+
+def test_memory_is_never_cached(api):
+    status, etag, body = get(api, "/memory")
+    assert status == 200 and etag is None and "budget" in body
@@ -0,0 +1,77 @@
+# Ringo Radar - tests of the caches and their shared memory budget - code by ringokakiage #
+import pandas as pd
+
+from ringo.cache import SizedCache
+from ringo.memory import MemoryBudget, default_budget
+from ringo.percentiles import MinutesPercentileIndex
+
+
+def test_budget_is_respected():
+    budget = MemoryBudget(100)
+    caches = [SizedCache(budget=budget, name=name) for name in ("images", "responses")]
+    for i in range(50):
+        caches[i % 2].put(i, b"x" * 15)
+        assert budget.size_bytes <= 100
+    assert budget.size_bytes == sum(cache.size_bytes for cache in caches) == 90
+    assert budget.evictions == 44
+    # The newest entries are the ones left
+    assert sorted(key for cache in caches for key, _ in cache.items()) == list(range(44, 50))
+
+
+def test_least_recently_used_entry_of_another_cache_goes_first():
+    budget = MemoryBudget(30)
+    images = SizedCache(budget=budget, name="images")
+    responses = SizedCache(budget=budget, name="responses")
+    images.put("a", b"x" * 10)
+    responses.put("b", b"x" * 10)
+    images.put("c", b"x" * 10)
+    assert images.get("a") is not None  # "b" is now the least recently used
+
+    images.put("d", b"x" * 10)
+
+    assert "b" not in responses and responses.stats()["evictions"] == 1
+    assert all(key in images for key in "acd")
+    assert budget.usage()["caches"] == {"images": {"entries": 3, "size_bytes": 30}}
+
+
+def test_entry_larger_than_the_budget_is_rejected():
+    budget = MemoryBudget(30)
+    images = SizedCache(budget=budget, name="images")
+    images.put("a", b"x" * 10)
+
+    images.put("big", b"x" * 31)
+
+    assert "big" not in images and "a" in images
+    assert budget.size_bytes == 10 and budget.evictions == 0
+    # Still rendered for the caller, just not kept
+    assert images.get_or_render("big", lambda: b"x" * 31) == b"x" * 31
+    assert "big" not in images
+
+
+def test_entry_larger_than_its_cache_is_rejected():
+    images = SizedCache(max_bytes=20, budget=MemoryBudget(100), name="images")
+    images.put("big", b"x" * 21)
+    assert "big" not in images and images.budget.size_bytes == 0
+
+
+def test_put_again_is_not_evicted_twice():
+    budget = MemoryBudget(20)
+    images = SizedCache(budget=budget, name="images")
+    images.put("a", b"x" * 10)
+    images.put("b", b"x" * 10)
+    images.put("a", b"y" * 10)  # "a" is the newest now
+    images.put("c", b"x" * 10)
+    assert "a" in images and "b" not in images and "c" in images
+    assert budget.size_bytes == images.size_bytes == 20
+
+
+def test_index_without_budget_uses_the_process_budget():
+    pool = pd.DataFrame({"League": ["ARG", "BRA", "ARG"], "Minutes played": [900, 600, 300],
+                         "wPwC": [1.0, 2.0, 3.0]})
+    before = default_budget().usage()["caches"]
+    index = MinutesPercentileIndex({"CB": pool})
+    index.at(500).percentiles("CB", None, ["wPwC"], [2.0])
+    index.at(500).position_dfs["CB"]
+    after = default_budget().usage()["caches"]
+    for name in ("percentile_trees", "position_pools"):
+        assert after[name]["entries"] == before.get(name, {"entries": 0})["entries"] + 1
@@ -0,0 +1,59 @@
+# Ringo Radar - tests of the batch export - code by ringokakiage #
+import json
+import os
+
+from ringo.engine import SCOPE_ALL, SCOPE_LEAGUE
+from ringo.export import MANIFEST_FILE, export_radars, file_base_name, read_manifest
+
+DATABASE = os.path.join(os.path.dirname(__file__), os.pardir, "database_jan25.csv")
+LEAGUE, TEAM = "ARG Copa de la Liga", "Boca Juniors"
+
+
+def export(out_dir, **kwargs):
+    kwargs.setdefault("min_minutes", 500)
+    return export_radars(str(out_dir), ["CF"], league=LEAGUE, team=TEAM, workers=1, dpi=30,
+                         database_path=DATABASE, log=lambda message: None, **kwargs)
+
+
+def test_resume_skips_exported_radars(tmp_path):
+    first = export(tmp_path)
+    assert (first["selected"], first["rendered"], first["failed"]) == (3, 3, 0)
+    records = list(read_manifest(str(tmp_path)).values())
+    assert all(os.path.exists(tmp_path / record["files"][0]) for record in records)
+
+    assert export(tmp_path)["rendered"] == 0
+    os.remove(tmp_path / records[0]["files"][0])
+    assert export(tmp_path)["rendered"] == 1
+
+
+def test_other_settings_get_their_own_files(tmp_path):
+    export(tmp_path, scope=SCOPE_ALL)
+    export(tmp_path, scope=SCOPE_LEAGUE)
+    export(tmp_path, scope=SCOPE_ALL, min_minutes=300)
+    records = read_manifest(str(tmp_path)).values()
+    files = [record["files"][0] for record in records]
+    assert len(records) == 9 and len(set(files)) == 9
+    # Nothing was overwritten, so resuming the first run still has nothing to do
+    assert export(tmp_path, scope=SCOPE_ALL)["rendered"] == 0
+
+
+def test_failed_radar_is_recorded_and_retried(tmp_path):
+    first = export(tmp_path)
+    record = next(iter(read_manifest(str(tmp_path)).values()))
+    job = {"key": record["key"], "wyscout_id": record["wyscout_id"], "player": record["player"],
+           "team": record["team"], "position_key": record["position"]}
+    assert record["files"] == [file_base_name(job) + ".png"]
+    # A directory where the radar goes makes its write fail
+    path = tmp_path / record["files"][0]
+    os.remove(path)
+    path.mkdir()
+
+    summary = export(tmp_path)
+
+    assert (summary["rendered"], summary["failed"]) == (0, 1)
+    assert "error" in read_manifest(str(tmp_path))[record["key"]]
+    path.rmdir()
+    assert export(tmp_path)["rendered"] == 1
+    assert "error" not in read_manifest(str(tmp_path))[record["key"]]
+    lines = (tmp_path / MANIFEST_FILE).read_text(encoding="utf-8").splitlines()
+    assert len(lines) == first["rendered"] + 2 and all(json.loads(line) for line in lines)
@@ -0,0 +1,37 @@
+# Ringo Radar - tests of the dated databases - code by ringokakiage #
+import os
+import shutil
+
+import numpy as np
+
+from ringo.data import DATABASE_PATH, load_database
+from ringo.engine import RadarEngine
+from ringo.history import DatabaseHistory
+
+REPO = os.path.join(os.path.dirname(__file__), os.pardir)
+
+
+def test_live_window_reuses_the_app_frame(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO)
+    older = tmp_path / "database_jul24.csv"
+    shutil.copy(DATABASE_PATH, older)
+    live = RadarEngine(DATABASE_PATH).df
+    history = DatabaseHistory([DATABASE_PATH, str(older)], load_live=lambda: live)
+    assert history.windows == ["jul24", "jan25"]
+
+    current, previous = history.engine("jan25").df, history.engine("jul24").df
+    # Numbers are the app's, names are encoded once for both windows
+    assert np.shares_memory(current["wPwC"].to_numpy(), live["wPwC"].to_numpy())
+    assert current["Player"].tolist() == live["Player"].tolist()
+    assert all(a is b for a, b in zip(current["Player"].cat.categories, previous["Player"].cat.categories))
+    assert history._sizes["jan25"] < history._sizes["jul24"]
+
+    player_history = history.player_history(346129, "GK", "league", min_minutes=500)
+    assert player_history["Window"].tolist() == ["jul24", "jan25"]
+    assert player_history.iloc[0, 1:].equals(player_history.iloc[1, 1:])
+
+
+def test_live_window_is_read_from_its_file_without_the_app(monkeypatch):
+    monkeypatch.chdir(REPO)
+    history = DatabaseHistory([DATABASE_PATH])
+    assert history.engine("jan25").df is not load_database(DATABASE_PATH)
@@ -0,0 +1,97 @@
+# Ringo Radar - tests of the incremental ingestion - code by ringokakiage #
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from ringo.data import database_hash
+from ringo.ingest import changed_positions_since, ingest, main, merge_export, read_export
+
+DATABASE = os.path.join(os.path.dirname(__file__), os.pardir, "database_jan25.csv")
+
+
+@pytest.fixture
+def small_database(tmp_path):
+    # Five goalkeepers and five centre forwards with a single position each
+    raw = pd.read_csv(DATABASE, index_col=0)
+    rows = pd.concat([raw[raw["Position"] == "GK"].head(5), raw[raw["Position"] == "CF"].head(5)])
+    path = tmp_path / "database_test.csv"
+    rows.to_csv(path)
+    return str(path)
+
+
+def write_export(tmp_path, rows, name="export.csv"):
+    path = tmp_path / name
+    rows.to_csv(path, index=False)
+    return str(path)
+
+
+def new_players(raw, count):
+    # Rows of the database as players that are not in it yet
+    rows = raw.head(count).copy()
+    rows["Wyscout id"] = [10 ** 9 + i for i in range(count)]
+    return rows
+
+
+def test_ingest_keeps_untouched_rows_byte_identical(tmp_path):
+    database = tmp_path / "database_jan25.csv"
+    shutil.copy(DATABASE, database)
+    before = database.read_bytes().splitlines()
+    export = tmp_path / "wyscout_mar25.csv"
+    new_players(pd.read_csv(database, index_col=0), 3).to_csv(export, index=False)
+
+    version = ingest(str(export), str(database))
+
+    assert (version["inserted"], version["updated"]) == (3, 0)
+    after = database.read_bytes().splitlines()
+    assert len(after) == len(before) + 3
+    assert after[:len(before)] == before
+
+
+def test_merge_export_inserts_new_player(small_database, tmp_path):
+    base = pd.read_csv(small_database, index_col=0)
+    player = new_players(base[base["Position"] == "CF"], 1)
+    merged, inserted, updated, changed = merge_export(base, read_export(write_export(tmp_path, player)))
+    assert inserted == [base.index.max() + 1] and updated == []
+    assert changed == ["CF"]
+    assert len(merged) == len(base) + 1
+    assert merged.loc[inserted[0], "Wyscout id"] == 10 ** 9
+
+
+def test_merge_export_updates_changed_row_in_place(small_database, tmp_path):
+    base = pd.read_csv(small_database, index_col=0)
+    row_id = base.index[base["Position"] == "GK"][0]
+    export = base.loc[[row_id]].assign(**{"Minutes played": 9999})
+    merged, inserted, updated, changed = merge_export(base, read_export(write_export(tmp_path, export)))
+    assert inserted == [] and updated == [row_id]
+    assert changed == ["GK"]
+    assert merged.loc[row_id, "Minutes played"] == 9999
+    assert merged.drop(index=row_id).equals(base.drop(index=row_id))
+
+
+def test_unchanged_export_is_nothing_new(small_database, tmp_path, capsys):
+    export = write_export(tmp_path, pd.read_csv(small_database, index_col=0))
+    before = open(small_database, "rb").read()
+    assert ingest(export, small_database) is None
+    main([export, "--database", small_database])
+    assert "nothing new" in capsys.readouterr().out
+    assert open(small_database, "rb").read() == before
+    assert not os.path.exists(small_database.replace(".csv", ".versions.jsonl"))
+
+
+def test_changed_positions_since(small_database, tmp_path):
+    base = pd.read_csv(small_database, index_col=0)
+    first_hash = database_hash(small_database)
+    cf_export = write_export(tmp_path, new_players(base[base["Position"] == "CF"], 1), "cf.csv")
+    gk_row = base[base["Position"] == "GK"].head(1).assign(**{"Minutes played": 9999})
+    gk_export = write_export(tmp_path, gk_row, "gk.csv")
+
+    assert ingest(cf_export, small_database)["positions"] == ["CF"]
+    second_hash = database_hash(small_database)
+    assert ingest(gk_export, small_database)["positions"] == ["GK"]
+
+    assert changed_positions_since(small_database, first_hash) == ["GK", "CF"]
+    assert changed_positions_since(small_database, second_hash) == ["GK"]
+    assert changed_positions_since(small_database, database_hash(small_database)) == []
+    assert changed_positions_since(small_database, "unknown") is None
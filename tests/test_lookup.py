@@ -0,0 +1,48 @@
+# Ringo Radar - tests of the league, team and player lookup - code by ringokakiage #
+import os
+
+import numpy as np
+import pytest
+
+from ringo.engine import RadarEngine
+from ringo.percentiles import player_pool_rows
+
+DATABASE = os.path.join(os.path.dirname(__file__), os.pardir, "database_jan25.csv")
+LEAGUE, TEAM, NAME = "ARG Copa de la Liga", "Deportivo Riestra", "G. Fernández"
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return RadarEngine(DATABASE)
+
+
+def test_teammates_with_the_same_name_stay_apart(engine):
+    lookup = engine.player_lookup()
+    assert lookup.players(LEAGUE, TEAM).count(NAME) == 1
+    assert lookup.player_ids(LEAGUE, TEAM, NAME) == [73240, 290751]
+    assert lookup.positions(LEAGUE, TEAM, NAME, 73240) == ["CF", "LW", "RWF"]
+    assert lookup.positions(LEAGUE, TEAM, NAME, 290751) == ["CF"]
+    # The name alone is the first of them
+    assert lookup.positions(LEAGUE, TEAM, NAME) == ["CF", "LW", "RWF"]
+    for wyscout_id in (73240, 290751):
+        player_info = (LEAGUE, TEAM, NAME, "CF", wyscout_id)
+        assert lookup.player_rows(player_info)["Wyscout id"].tolist() == [wyscout_id]
+        assert lookup.pool_row("CF", player_info)["Wyscout id"].tolist() == [wyscout_id]
+    assert engine.percentiles((LEAGUE, TEAM, NAME, "CF", 73240), min_minutes=0) != \
+        engine.percentiles((LEAGUE, TEAM, NAME, "CF", 290751), min_minutes=0)
+
+
+@pytest.mark.parametrize("min_minutes", [0, 500])
+def test_pool_rows_match_masking_the_pool(engine, min_minutes):
+    lookup = engine.player_lookup()
+    for position_key, pool in engine.minutes_index().position_dfs.items():
+        keys = pool[["League", "Team within selected timeframe", "Player", "Wyscout id"]].drop_duplicates()
+        # Every player sharing a name with a teammate, and a sample of the others
+        shared = keys.duplicated(subset=keys.columns[:3], keep=False).to_numpy()
+        sample = shared | (np.arange(len(keys)) % 20 == 0)
+        for league, team, player, wyscout_id in keys[sample].itertuples(index=False):
+            player_info = (league, team, player, None, int(wyscout_id))
+            expected = player_pool_rows(pool, player_info, min_minutes)
+            assert lookup.pool_row(position_key, player_info, min_minutes).index.equals(expected.index[:1])
+            rows = lookup.player_rows(player_info)
+            assert rows.index.equals(player_pool_rows(engine.df, player_info).index)
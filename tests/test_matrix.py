@@ -0,0 +1,62 @@
+# Ringo Radar - tests of the percentile matrix - code by ringokakiage #
+import os
+
+import numpy as np
+import pytest
+
+from ringo.data import METRIC_COLUMNS
+from ringo.engine import RadarEngine
+from ringo.matrix import PercentileMatrix
+from ringo.percentiles import PercentileEngine
+from ringo.positions import create_position_dfs
+
+DATABASE = os.path.join(os.path.dirname(__file__), os.pardir, "database_jan25.csv")
+THRESHOLDS = (0, 500)
+POSITIONS = ("CB", "WIN")
+
+
+@pytest.fixture(scope="module")
+def df():
+    return RadarEngine(DATABASE).df
+
+
+@pytest.fixture(scope="module")
+def matrix(df):
+    return PercentileMatrix.build(df, THRESHOLDS, positions=POSITIONS, dataset_hash="test")
+
+
+@pytest.mark.parametrize("min_minutes", THRESHOLDS)
+def test_matrix_matches_the_percentile_engine(df, matrix, min_minutes):
+    position_dfs = create_position_dfs(df, min_minutes)
+    engine = PercentileEngine(position_dfs)
+    for position_key in POSITIONS:
+        pool = position_dfs[position_key].sort_index()
+        for same_league in (False, True):
+            row_ids, percentiles = matrix.table(min_minutes, same_league, position_key)
+            assert row_ids.tolist() == pool.index.tolist()
+            for row_id, row in zip(row_ids[::25], percentiles[::25]):
+                player = pool.loc[row_id]
+                scope = player["League"] if same_league else None
+                expected = engine.percentiles(position_key, scope, METRIC_COLUMNS, player[METRIC_COLUMNS].tolist())
+                np.testing.assert_allclose(row, expected, atol=0.005)
+                assert matrix.lookup(min_minutes, same_league, position_key, row_id, METRIC_COLUMNS[:2]).tolist() == \
+                    row[:2].tolist()
+
+
+def test_unstored_pools_are_none(matrix):
+    assert matrix.table(300, False, "CB") is None
+    assert matrix.table(500, False, "GK") is None
+    assert matrix.lookup(500, False, "CB", -1, METRIC_COLUMNS) is None
+
+
+def test_save_load_and_update(df, matrix, tmp_path):
+    loaded = PercentileMatrix.load(matrix.save(str(tmp_path / "matrix.npz")))
+    assert (loaded.thresholds, loaded.dataset_hash) == (list(THRESHOLDS), "test")
+    for name in ("threshold", "same_league", "position", "row_ids", "percentiles"):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(matrix, name))
+
+    # Recomputing one position gives the same matrix as building it again
+    updated = matrix.update(df, ["WIN"], dataset_hash="updated")
+    assert updated.dataset_hash == "updated"
+    np.testing.assert_array_equal(updated.percentiles, matrix.percentiles)
+    np.testing.assert_array_equal(updated.row_ids, matrix.row_ids)
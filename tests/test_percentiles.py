@@ -0,0 +1,98 @@
+# Ringo Radar - tests of the minutes percentile index - code by ringokakiage #
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from ringo.memory import MemoryBudget
+from ringo.percentiles import (
+    PERCENTILE_KINDS, MergeSortTree, MinutesPercentileIndex, PercentileEngine, rank_percentiles,
+)
+
+THRESHOLDS = [0, 1, 300, 450, 500, 800, 5000]
+
+
+def make_pool(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.integers(0, 20, rows).astype(float) / 4  # plenty of ties
+    values[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        "League": rng.choice(["ARG", "BRA", "CHI", "URU"], rows),
+        "Minutes played": rng.integers(0, 3000, rows),
+        "wPwC": values,
+        "Player": rng.choice(["A", "B", "C"], rows),
+        "Team within selected timeframe": rng.choice(["X", "Y"], rows),
+    }, index=rng.permutation(rows) * 10)
+
+
+@pytest.mark.parametrize("kind", PERCENTILE_KINDS)
+@pytest.mark.parametrize("rows", [0, 1, 2, 7, 300])
+def test_rank_percentiles_match_percentileofscore(kind, rows):
+    # NaNs of the pool are left out, like nan_policy="omit"; a NaN score has no percentile
+    values = make_pool(rows)["wPwC"].to_numpy()
+    scores = np.array([-1.0, 0.0, 0.25, 2.5, 4.75, 10.0, np.nan])
+    found = rank_percentiles(np.sort(values[~np.isnan(values)]), scores, kind)
+    expected = [stats.percentileofscore(values, score, kind, nan_policy="omit") for score in scores]
+    np.testing.assert_allclose(found, expected)
+    np.testing.assert_allclose(rank_percentiles(np.sort(values[~np.isnan(values)]), scores[2], kind), expected[2])
+
+
+@pytest.mark.parametrize("kind", PERCENTILE_KINDS)
+def test_engine_percentiles_match_percentileofscore(kind):
+    pool = make_pool().assign(**{"Fouls per 90": make_pool(seed=1)["wPwC"].to_numpy()})
+    engine = PercentileEngine({"CB": pool}, kind=kind)
+    for scope in [None, "ARG"]:
+        scoped = pool if scope is None else pool[pool["League"] == scope]
+        for value in [0.0, 2.5, 3.0]:
+            found = engine.percentiles("CB", scope, ["wPwC", "Fouls per 90"], [value, value])
+            expected = [stats.percentileofscore(scoped["wPwC"], value, kind, nan_policy="omit"),
+                        100 - stats.percentileofscore(scoped["Fouls per 90"], value, kind, nan_policy="omit")]
+            np.testing.assert_allclose(found, expected)
+
+
+@pytest.mark.parametrize("rows", [1, 2, 7, 64, 300])
+def test_merge_sort_tree_counts_match_brute_force(rows):
+    pool = make_pool(rows)
+    # Same order as the index: most minutes first, so a threshold is a prefix
+    order = np.argsort(-pool["Minutes played"].to_numpy(), kind="stable")
+    values = pool["wPwC"].to_numpy()[order]
+    minutes = pool["Minutes played"].to_numpy()[order]
+    tree = MergeSortTree(values)
+    for min_minutes in THRESHOLDS:
+        p = int((minutes >= min_minutes).sum())
+        prefix = values[:p][~np.isnan(values[:p])]
+        assert tree.valid[p] == len(prefix)
+        for x in [-1.0, 0.0, 1.25, 2.5, 4.75, 10.0]:
+            assert tree.count(p, x, "left") == (prefix < x).sum()
+            assert tree.count(p, x, "right") == (prefix <= x).sum()
+            assert tree.counts(p, x) == ((prefix < x).sum(), (prefix <= x).sum())
+
+
+@pytest.mark.parametrize("kind", PERCENTILE_KINDS)
+def test_index_matches_filtered_pools(kind):
+    pool = make_pool()
+    index = MinutesPercentileIndex({"CB": pool}, kind=kind, budget=MemoryBudget())
+    values = [0.0, 2.5, np.nan, 4.75]
+    for min_minutes in THRESHOLDS:
+        filtered = pool[pool["Minutes played"] >= min_minutes]
+        view = index.at(min_minutes)
+        assert view.pool("CB").index.equals(filtered.index)
+        player = ("BRA", "X", "B", "CB")
+        assert view.pool_row("CB", player).index.equals(PercentileEngine({"CB": filtered}).pool_row("CB", player).index)
+        for scope in [None, "ARG", "PER"]:
+            engine = PercentileEngine({"CB": filtered}, kind=kind)
+            assert view.pool_size("CB", scope) == engine.pool_size("CB", scope)
+            assert view.league_count("CB", scope) == engine.league_count("CB", scope)
+            for value in values:
+                np.testing.assert_allclose(view.percentiles("CB", scope, ["wPwC"], [value]),
+                                           engine.percentiles("CB", scope, ["wPwC"], [value]))
+
+
+def test_threshold_pools_are_cached_in_the_budget():
+    budget = MemoryBudget()
+    index = MinutesPercentileIndex({"CB": make_pool()}, budget=budget)
+    assert "CB" in index.at(500).position_dfs and "GK" not in index.at(500).position_dfs
+    assert budget.usage()["caches"] == {}  # membership builds nothing
+    first = index.at(500).position_dfs["CB"]
+    assert index.at(500).position_dfs["CB"] is first
+    assert budget.usage()["caches"]["position_pools"]["entries"] == 1
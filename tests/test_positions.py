@@ -0,0 +1,43 @@
+# Ringo Radar - tests of the position pools - code by ringokakiage #
+import os
+
+import pandas as pd
+import pytest
+
+from ringo.positions import (DEDUP_COLUMNS, POSITION_COLUMNS, POSITION_KEYS, create_position_dfs,
+                             normalize_positions, position_map)
+
+DATABASE = os.path.join(os.path.dirname(__file__), os.pardir, "database_jan25.csv")
+
+
+@pytest.fixture(scope="module")
+def database():
+    return normalize_positions(pd.read_csv(DATABASE, index_col=0), position_map)
+
+
+@pytest.fixture(scope="module")
+def row_positions(database):
+    # Positions of each row, read row by row like the original pools did
+    return database[POSITION_COLUMNS].apply(lambda x: set(x.values), axis=1)
+
+
+def row_by_row_pool(df, row_positions, position_key, min_minutes):
+    # The original pools: filtered first, deduplicated after
+    pool = df[(df["Minutes played"] >= min_minutes) & row_positions.map(lambda x: position_key in x)]
+    return pool.drop_duplicates(subset=DEDUP_COLUMNS, keep="first")
+
+
+@pytest.mark.parametrize("min_minutes", [0, 500, 1500])
+def test_pools_match_the_row_by_row_filter(database, row_positions, min_minutes):
+    position_dfs = create_position_dfs(database, min_minutes)
+    assert list(position_dfs) == POSITION_KEYS
+    for position_key in POSITION_KEYS:
+        expected = row_by_row_pool(database, row_positions, position_key, min_minutes)
+        assert position_dfs[position_key].index.equals(expected.index)
+
+
+def test_raw_positions_give_the_same_pools(database):
+    raw = pd.read_csv(DATABASE, index_col=0)
+    normalized = create_position_dfs(database, 500)
+    for position_key, pool in create_position_dfs(raw, 500).items():
+        assert pool.index.equals(normalized[position_key].index)
@@ -0,0 +1,55 @@
+# Ringo Radar - tests of the shortlist screening - code by ringokakiage #
+import os
+
+import numpy as np
+import pytest
+
+from ringo.data import METRIC_COLUMNS
+from ringo.engine import SCOPE_ALL, SCOPE_LEAGUE, RadarEngine
+from ringo.percentiles import PercentileEngine
+from ringo.positions import create_position_dfs
+from ringo.screening import SCORE_COLUMN, page, page_count, screen
+
+DATABASE = os.path.join(os.path.dirname(__file__), os.pardir, "database_jan25.csv")
+CRITERIA = {"Aerial impact": 60, "wDpwC": 60}
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return RadarEngine(DATABASE)
+
+
+@pytest.mark.parametrize("scope", [SCOPE_ALL, SCOPE_LEAGUE])
+def test_screen_matches_checking_every_player(engine, scope):
+    result = screen(engine, ["CB", "LB"], CRITERIA, scope, min_minutes=500, max_age=25)
+    position_dfs = create_position_dfs(engine.df, 500)
+    percentiles = PercentileEngine(position_dfs)
+    metrics = list(CRITERIA)
+    found = set(zip(result["Wyscout id"], result["Team within selected timeframe"], result["Position key"]))
+    for position_key in ("CB", "LB"):
+        for _, player in position_dfs[position_key].iterrows():
+            league = player["League"] if scope == SCOPE_LEAGUE else None
+            values = percentiles.percentiles(position_key, league, metrics, player[metrics].tolist())
+            # The matrix keeps two decimals, players right at a threshold could go either way
+            if np.any(np.abs(values - list(CRITERIA.values())) < 0.01):
+                continue
+            expected = bool(np.all(values >= list(CRITERIA.values()))) and player["Age"] <= 25
+            key = (player["Wyscout id"], player["Team within selected timeframe"], position_key)
+            assert (key in found) == expected, key
+
+
+def test_default_order_and_pages(engine):
+    result = screen(engine, ["CB"], CRITERIA, min_minutes=500)
+    assert result[SCORE_COLUMN].is_monotonic_decreasing
+    np.testing.assert_allclose(result[SCORE_COLUMN], result[list(CRITERIA)].mean(axis=1))
+    assert page_count(result, 10) == -(-len(result) // 10)
+    assert page(result, 2, page_size=10).equals(result.iloc[10:20])
+    assert page(result, page_count(result, 10) + 1, page_size=10).empty
+
+
+def test_bad_queries(engine):
+    with pytest.raises(ValueError):
+        screen(engine, ["CB"], {"Nope": 50})
+    with pytest.raises(ValueError):
+        screen(engine, ["CB"], sort_by="Nope")
+    assert list(screen(engine, [], min_minutes=500).columns)[-len(METRIC_COLUMNS):] == METRIC_COLUMNS
@@ -0,0 +1,51 @@
+# Ringo Radar - tests of the player name search - code by ringokakiage #
+import os
+
+import pandas as pd
+import pytest
+
+from ringo.search import NameIndex, normalize_text
+
+DATABASE = os.path.join(os.path.dirname(__file__), os.pardir, "database_jan25.csv")
+COLUMNS = ["Player", "Team within selected timeframe", "League", "Wyscout id"]
+
+
+@pytest.fixture(scope="module")
+def database():
+    return pd.read_csv(DATABASE, index_col=0)
+
+
+@pytest.fixture(scope="module")
+def index(database):
+    return NameIndex(database)
+
+
+def test_teammates_with_the_same_name_are_both_found(database, index):
+    rows = database.loc[index.search("G. Fernández")]
+    riestra = rows[rows["Team within selected timeframe"] == "Deportivo Riestra"]
+    assert sorted(riestra["Wyscout id"]) == [73240, 290751]
+    assert len(index) == len(database.drop_duplicates(subset=COLUMNS))
+
+
+def test_accents_and_case_are_ignored(database, index):
+    assert database.loc[index.search("ZENON")[0], "Player"] == "K. Zenón"
+
+
+def test_names_starting_with_the_query_come_first(database, index):
+    names = [normalize_text(name) for name in database.loc[index.search("rodri", limit=1000), "Player"]]
+    starts = [name.startswith("rodri") for name in names]
+    assert starts == sorted(starts, reverse=True) and starts[0]
+
+
+@pytest.mark.parametrize("query", ["fernandez", "riestra", "liga mx", "junior", "ande"])
+def test_matches_name_team_or_league(database, index, query):
+    entries = database.drop_duplicates(subset=COLUMNS)
+    text = entries[COLUMNS[:3]].map(normalize_text)
+    expected = entries.index[text.apply(lambda col: col.str.contains(query, regex=False)).any(axis=1)]
+    found = index.search(query, limit=len(entries))
+    assert len(found) == len(set(found)) and set(found) == set(expected)
+
+
+def test_limit(index):
+    assert len(index.search("a", limit=7)) == 7
+    assert index.search("   ") == []
@@ -0,0 +1,59 @@
+# Ringo Radar - tests of the league shards - code by ringokakiage #
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ringo.data import database_hash
+from ringo.engine import SCOPE_ALL, SCOPE_LEAGUE, RadarEngine
+from ringo.ingest import ingest
+from ringo.plot import radar_texts
+from ringo.shards import ShardedDataset, is_current, read_manifest, shards_path, write_shards
+
+DATABASE = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, "database_jan25.csv"))
+PLAYER = ("ARG Copa de la Liga", "Boca Juniors", "K. Zenón", "LW")
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    return ShardedDataset(write_shards(DATABASE, str(tmp_path_factory.mktemp("shards"))))
+
+
+@pytest.mark.parametrize("scope", [SCOPE_ALL, SCOPE_LEAGUE])
+@pytest.mark.parametrize("min_minutes", [0, 500, 1000])
+def test_sharded_radar_matches_unsharded(dataset, scope, min_minutes):
+    engine = RadarEngine(DATABASE)
+    sharded = dataset.engine(scope, PLAYER[0])
+    expected = engine.pizza_values(PLAYER, scope, min_minutes)
+    values = sharded.pizza_values(PLAYER, scope, min_minutes)
+    assert radar_texts(PLAYER, values, "metrics", min_minutes=min_minutes) == \
+        radar_texts(PLAYER, expected, "metrics", min_minutes=min_minutes)
+    np.testing.assert_allclose(values["percentiles"], expected["percentiles"])
+    assert sharded.render_key(PLAYER, scope, min_minutes) == engine.render_key(PLAYER, scope, min_minutes)
+
+
+def test_engines_take_the_source_csv(dataset):
+    assert dataset.source_path == DATABASE
+    assert dataset.league_engine(PLAYER[0]).dataset_hash == database_hash(DATABASE)
+    assert dataset.global_engine().database_path == DATABASE
+
+
+def test_ingest_rewrites_changed_shards_only(tmp_path):
+    database = tmp_path / "database_jan25.csv"
+    shutil.copy(DATABASE, database)
+    shards_dir = write_shards(str(database))
+    before = {shard["league"]: shard["sha256"] for shard in read_manifest(shards_dir)["shards"]}
+    raw = pd.read_csv(database, index_col=0)
+    row_id = raw.index[raw["League"] == PLAYER[0]][0]
+    export = tmp_path / "wyscout_mar25.csv"
+    raw.loc[[row_id]].assign(**{"Minutes played": 9999}).to_csv(export, index=False)
+
+    ingest(str(export), str(database))
+
+    assert is_current(shards_path(str(database)))
+    after = {shard["league"]: shard["sha256"] for shard in read_manifest(shards_dir)["shards"]}
+    assert [league for league in before if before[league] != after[league]] == [PLAYER[0]]
+    league_rows = ShardedDataset(shards_dir).league_engine(PLAYER[0]).df
+    assert league_rows.loc[row_id, "Minutes played"] == 9999
@@ -0,0 +1,48 @@
+# Ringo Radar - tests of the similar players search - code by ringokakiage #
+import os
+
+import numpy as np
+import pytest
+
+from ringo.data import METRIC_COLUMNS
+from ringo.engine import RadarEngine
+from ringo.positions import create_position_dfs
+from ringo.similarity import TRANSFORMS, SimilarityIndex, transform_metrics
+
+DATABASE = os.path.join(os.path.dirname(__file__), os.pardir, "database_jan25.csv")
+
+
+@pytest.fixture(scope="module")
+def position_dfs():
+    return create_position_dfs(RadarEngine(DATABASE).df, 0)
+
+
+@pytest.mark.parametrize("transform", TRANSFORMS)
+@pytest.mark.parametrize("filters", [{}, {"min_minutes": 900, "max_age": 24}, {"league": "ARG Copa de la Liga"}])
+def test_similar_matches_brute_force(position_dfs, transform, filters):
+    index = SimilarityIndex(position_dfs, transform=transform)
+    pool = position_dfs["CB"]
+    points = transform_metrics(pool[METRIC_COLUMNS].to_numpy(dtype=float), transform)
+    keep = np.ones(len(pool), dtype=bool)
+    if "league" in filters:
+        keep &= (pool["League"] == filters["league"]).to_numpy()
+    if "max_age" in filters:
+        keep &= (pool["Age"] <= filters["max_age"]).to_numpy()
+    if "min_minutes" in filters:
+        keep &= (pool["Minutes played"] >= filters["min_minutes"]).to_numpy()
+    for position in range(0, len(pool), 97):
+        distances = np.linalg.norm(points - points[position], axis=1)
+        candidates = keep.copy()
+        candidates[position] = False
+        expected = np.sort(distances[candidates])[:10]
+        found = index.similar("CB", pool.index[position], k=10, **filters)
+        assert pool.index[position] not in found.index
+        np.testing.assert_allclose(found["Distance"], np.around(expected, 3))
+
+
+def test_unknown_position_or_no_match(position_dfs):
+    index = SimilarityIndex(position_dfs)
+    with pytest.raises(KeyError):
+        index.similar("XX", 0)
+    row_id = position_dfs["GK"].index[0]
+    assert index.similar("GK", row_id, league="Nope").empty